@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
+import httpx
 
 class Settings(BaseSettings):
     # API Keys
@@ -43,6 +44,7 @@ class Settings(BaseSettings):
     # Cache
     CACHE_TTL_DEFAULT: int = 3600
     CACHE_SIMILARITY_THRESHOLD: float = 0.85
+    SEMANTIC_CACHE_THRESHOLD: float = 0.85  # Min similarity to replay cached response audio
     
     # Logging
     LOG_LEVEL: str = "INFO"
@@ -51,9 +53,21 @@ class Settings(BaseSettings):
     # Audio Processing
     SAMPLE_RATE: int = 16000
     CHUNK_DURATION_MS: int = 100
+    STT_BATCH_MS: int = 100  # Coalescing window for streaming STT audio sends
+    STT_RACE_MODE: bool = False  # Query all STT providers in parallel (doubles API cost)
     
     class Config:
         env_file = ".env"
         case_sensitive = True
 
 settings = Settings()
+
+
+# Per-stage HTTP timeouts (seconds), sized to each provider's p99 latency so a
+# stuck connection fails fast instead of hanging the user's turn
+TIMEOUTS: Dict[str, httpx.Timeout] = {
+    "deepgram_stt": httpx.Timeout(connect=1.0, read=3.0, write=5.0, pool=1.0),
+    "cartesia_tts": httpx.Timeout(connect=1.0, read=3.0, write=5.0, pool=1.0),
+    "assemblyai_upload": httpx.Timeout(connect=2.0, read=15.0, write=15.0, pool=1.0),
+    "groq_llm": httpx.Timeout(10.0),
+}
@@ -0,0 +1,44 @@
+"""
+Reusable byte buffers for the audio hot path.
+"""
+from collections import deque
+
+
+class AudioBufferPool:
+    """
+    Pool of fixed-size bytearrays for code that fills a scratch buffer,
+    hands it off, and is done with it (e.g. batching audio for a send).
+
+    Steady-state callers stop allocating a fresh buffer per frame/batch.
+    Buffers that grew past buffer_size (an oversized payload) are not
+    returned to the pool, so the pool only ever holds the standard size.
+    """
+
+    __slots__ = ("buffer_size", "max_buffers", "_free")
+
+    def __init__(self, buffer_size: int, max_buffers: int = 64):
+        """
+        Initialize the pool.
+
+        Args:
+            buffer_size: Size in bytes of every pooled buffer
+            max_buffers: Maximum number of idle buffers kept for reuse
+        """
+        self.buffer_size = buffer_size
+        self.max_buffers = max_buffers
+        self._free: deque = deque()
+
+    def acquire(self) -> bytearray:
+        """Get a buffer of buffer_size bytes (contents are stale, not zeroed)."""
+        try:
+            return self._free.popleft()
+        except IndexError:
+            return bytearray(self.buffer_size)
+
+    def release(self, buffer: bytearray):
+        """Return a buffer once nothing references it any more."""
+        if len(buffer) == self.buffer_size and len(self._free) < self.max_buffers:
+            self._free.append(buffer)
+
+    def __len__(self) -> int:
+        return len(self._free)
@@ -7,8 +7,10 @@ import logging
 import hashlib
 from datetime import datetime
 from typing import Optional, Dict, Any, List, Tuple
+from app.config import settings
 from app.core.redis import get_redis
-from app.utils.embeddings import get_embedding, cosine_similarity
+from app.core.executor import run_blocking
+from app.utils.embeddings import get_embedding, EmbeddingIndex
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +34,12 @@ class SemanticCache:
         self.similarity_threshold = similarity_threshold
         self.default_ttl = default_ttl
         self._stats = {"hits": 0, "misses": 0}
+        
+        # Local similarity index mirroring the embeddings stored in Redis
+        self._index = EmbeddingIndex()
+        self._index_keys: List[str] = []
+        self._embeddings: Dict[str, List[float]] = {}
+        self._synced_keys: set = set()
     
     def _get_cache_key(self, query: str) -> str:
         """Generate a unique cache key from query text."""
@@ -80,46 +88,33 @@ class SemanticCache:
             # Get query embedding
             query_embedding = get_embedding(query)
             
-            # Get all cached embeddings from index
+            # Get all cached keys from index
             cached_keys = await redis.smembers(INDEX_KEY)
             if not cached_keys:
                 self._stats["misses"] += 1
                 return None
             
-            best_match = None
-            best_similarity = 0.0
+            keys = {key.decode() if isinstance(key, bytes) else key for key in cached_keys}
+            if keys != self._synced_keys:
+                await self._sync_index(redis, keys)
             
-            for key in cached_keys:
-                key_str = key.decode() if isinstance(key, bytes) else key
-                
-                # Get cached embedding
-                emb_key = f"{EMBEDDING_PREFIX}{key_str}"
-                cached_emb_json = await redis.get(emb_key)
-                
-                if not cached_emb_json:
-                    continue
-                
-                cached_embedding = json.loads(cached_emb_json)
-                similarity = cosine_similarity(query_embedding, cached_embedding)
-                
-                if similarity > best_similarity and similarity >= self.similarity_threshold:
-                    best_similarity = similarity
-                    best_match = key_str
+            # A few runners-up in case the best entry's response has expired
+            matches = self._index.query(query_embedding, top_k=3, threshold=self.similarity_threshold)
             
-            if best_match:
+            for row, similarity in matches:
                 # Retrieve cached response
-                cache_key = f"{CACHE_PREFIX}{best_match}"
+                cache_key = f"{CACHE_PREFIX}{self._index_keys[row]}"
                 cached_data = await redis.get(cache_key)
                 
                 if cached_data:
                     self._stats["hits"] += 1
                     data = json.loads(cached_data)
-                    logger.info(f"🎯 Cache HIT (similarity={best_similarity:.3f}): {query[:50]}...")
+                    logger.info(f"🎯 Cache HIT (similarity={similarity:.3f}): {query[:50]}...")
                     return {
                         "response": data["response"],
                         "metadata": {
                             "cached": True,
-                            "similarity": round(best_similarity, 3),
+                            "similarity": round(similarity, 3),
                             "original_query": data.get("query", ""),
                             "cached_at": data.get("cached_at", "")
                         }
@@ -134,6 +129,20 @@ class SemanticCache:
             self._stats["misses"] += 1
             return None
     
+    async def _sync_index(self, redis, keys: set):
+        """Re-sync the local index with the Redis key set, fetching only new embeddings."""
+        self._embeddings = {k: v for k, v in self._embeddings.items() if k in keys}
+        
+        for key in keys - self._embeddings.keys():
+            cached_emb_json = await redis.get(f"{EMBEDDING_PREFIX}{key}")
+            if cached_emb_json:
+                self._embeddings[key] = json.loads(cached_emb_json)
+        
+        self._index_keys = list(self._embeddings)
+        self._index.clear()
+        self._index.add(list(self._embeddings.values()))
+        self._synced_keys = keys
+    
     async def set(
         self,
         query: str,
@@ -183,8 +192,9 @@ class SemanticCache:
             await redis.set(cache_key, json.dumps(cache_data), ttl=ttl)
             await redis.set(emb_key, json.dumps(embedding), ttl=ttl)
             
-            # Add to index
+            # Add to index (and keep the embedding so the local index needn't refetch it)
             await redis.sadd(INDEX_KEY, key_hash)
+            self._embeddings[key_hash] = embedding
             
             logger.info(f"💾 Cached response (TTL={ttl}s): {query[:50]}...")
             return True
@@ -234,6 +244,10 @@ class SemanticCache:
             
             await redis.delete(INDEX_KEY)
             self._stats = {"hits": 0, "misses": 0}
+            self._index.clear()
+            self._index_keys = []
+            self._embeddings = {}
+            self._synced_keys = set()
             
             logger.info(f"🧹 Cleared {deleted} cached entries")
             return deleted
@@ -254,8 +268,115 @@ class SemanticCache:
         }
 
 
-# Global cache instance
+class TTSAudioCache:
+    """
+    In-process cache of synthesized responses, keyed by utterance embedding
+    plus the conversation context it was asked in.
+    
+    Holds the response text together with the TTS audio that was sent for it,
+    so a repeated (or semantically equivalent) question can be answered
+    straight from memory, skipping both the LLM and TTS. An entry only matches
+    a turn whose recent history is identical, so a short follow-up never
+    replays an answer given in another conversation.
+    """
+    
+    # Audio is ~48KB per second of speech, so keep the cache small
+    MAX_ENTRIES = 64
+    # Shorter utterances ("yes", "why?") depend on context too much to reuse
+    MIN_QUERY_WORDS = 3
+    
+    def __init__(self, similarity_threshold: float = 0.85):
+        self.similarity_threshold = similarity_threshold
+        self._entries: List[Dict[str, Any]] = []
+        self._embeddings: List[List[float]] = []
+        self._index = EmbeddingIndex()
+        self._stats = {"hits": 0, "misses": 0}
+    
+    def _is_cacheable(self, query: str) -> bool:
+        return len(query.split()) >= self.MIN_QUERY_WORDS
+    
+    async def get(self, query: str, context: tuple = ()) -> Optional[Dict[str, Any]]:
+        """
+        Find cached audio for a semantically similar utterance.
+        
+        Args:
+            query: The user's transcript
+            context: Hashable fingerprint of the history before the utterance
+            
+        Returns:
+            Dict with 'query', 'response', 'audio' (list of WAV segments) and
+            'similarity', or None if nothing is similar enough
+        """
+        if not self._entries or not self._is_cacheable(query):
+            self._stats["misses"] += 1
+            return None
+        
+        # The embedding model is CPU-bound; keep it off the event loop
+        embedding = await run_blocking(get_embedding, query)
+        matches = self._index.query(embedding, top_k=len(self._entries), threshold=self.similarity_threshold)
+        match = next(((row, sim) for row, sim in matches if self._entries[row]["context"] == context), None)
+        
+        if match is None:
+            self._stats["misses"] += 1
+            return None
+        
+        row, similarity = match
+        self._stats["hits"] += 1
+        logger.info(f"🎯 Audio cache HIT (similarity={similarity:.3f}): {query[:50]}...")
+        return {**self._entries[row], "similarity": similarity}
+    
+    async def put(self, query: str, response: str, audio: List[bytes], context: tuple = ()):
+        """
+        Cache the audio sent for a response.
+        
+        Args:
+            query: The user's transcript the response answered
+            response: The full response text
+            audio: WAV segments in playback order
+            context: Hashable fingerprint of the history before the utterance
+        """
+        if not audio or not self._is_cacheable(query):
+            return
+        
+        embedding = await run_blocking(get_embedding, query)
+        self._entries.append({"query": query, "response": response, "audio": audio, "context": context})
+        self._embeddings.append(embedding)
+        
+        if len(self._entries) > self.MAX_ENTRIES:
+            # Evict the oldest entry; index rows are positional, so rebuild
+            self._entries.pop(0)
+            self._embeddings.pop(0)
+            self._index.clear()
+            self._index.add(self._embeddings)
+        else:
+            self._index.add(embedding)
+        
+        logger.debug(f"💾 Cached response audio ({len(audio)} segments): {query[:50]}...")
+    
+    def clear(self) -> int:
+        """Clear all cached audio."""
+        cleared = len(self._entries)
+        self._entries = []
+        self._embeddings = []
+        self._index.clear()
+        self._stats = {"hits": 0, "misses": 0}
+        return cleared
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache hit/miss statistics."""
+        total = self._stats["hits"] + self._stats["misses"]
+        hit_rate = (self._stats["hits"] / total * 100) if total > 0 else 0
+        return {
+            "hits": self._stats["hits"],
+            "misses": self._stats["misses"],
+            "size": len(self._entries),
+            "hit_rate": f"{hit_rate:.1f}%"
+        }
+
+
+# Global cache instances
 _semantic_cache: Optional[SemanticCache] = None
+_tts_audio_cache: Optional[TTSAudioCache] = None
 
 
 async def get_semantic_cache() -> SemanticCache:
@@ -264,3 +385,11 @@ async def get_semantic_cache() -> SemanticCache:
     if _semantic_cache is None:
         _semantic_cache = SemanticCache()
     return _semantic_cache
+
+
+def get_tts_audio_cache() -> TTSAudioCache:
+    """Get the global TTS audio cache instance."""
+    global _tts_audio_cache
+    if _tts_audio_cache is None:
+        _tts_audio_cache = TTSAudioCache(similarity_threshold=settings.SEMANTIC_CACHE_THRESHOLD)
+    return _tts_audio_cache
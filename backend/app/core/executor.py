@@ -0,0 +1,35 @@
+"""
+Shared Thread Pool for Blocking Audio Work
+
+ffmpeg/pydub decodes block for tens of milliseconds per chunk. Running them
+here keeps the event loop (and every other session's WebSocket I/O) moving.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, TypeVar
+
+T = TypeVar('T')
+
+# Sized to the CPU count: decodes are mostly spent in ffmpeg subprocesses/numpy
+AUDIO_EXECUTOR = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 4,
+    thread_name_prefix="audio"
+)
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking function on the shared audio thread pool.
+    
+    Args:
+        func: Blocking callable
+        *args, **kwargs: Arguments passed to func
+        
+    Returns:
+        Whatever func returns
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(AUDIO_EXECUTOR, partial(func, *args, **kwargs))
@@ -0,0 +1,38 @@
+"""
+Shared HTTP Client
+One pooled HTTP/2 client for provider APIs (Deepgram, Cartesia, AssemblyAI, Groq),
+so requests reuse warm TCP+TLS connections and multiplex over them instead
+of opening a new connection per call.
+"""
+
+import logging
+from typing import Optional
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Connection pool limits for the shared client
+HTTP_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=20,
+    keepalive_expiry=30.0
+)
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the global HTTP/2 client, creating it on first use."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(http2=True, limits=HTTP_LIMITS)
+    return _http_client
+
+
+async def close_http_client():
+    """Close the global HTTP client (called on app shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        logger.info("🔌 Shared HTTP client closed")
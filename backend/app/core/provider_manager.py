@@ -179,6 +179,90 @@ class ProviderManager(Generic[T]):
                 f"All {self.provider_type.value} providers failed: {error_summary}"
             )
     
+    async def execute_race(self, *args, **kwargs) -> T:
+        """
+        Run all available providers concurrently and return the first usable result.
+        
+        Trades one call per provider for the latency of the fastest one. A falsy
+        result (e.g. an empty transcript) only wins once every other provider
+        has finished or failed. Remaining calls are cancelled.
+        """
+        providers = self.available_providers
+        if len(providers) < 2:
+            return await self.execute(*args, **kwargs)
+        
+        tasks = {asyncio.create_task(p.execute(*args, **kwargs)): p for p in providers}
+        pending = set(tasks)
+        settled = set()
+        errors = []
+        empty_result = None
+        
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                
+                # Record every finished call before picking a winner, so a
+                # provider finishing alongside the winner still counts
+                winner = None
+                for task in done:
+                    settled.add(task)
+                    provider = tasks[task]
+                    if not await self._record_race_outcome(task, provider, errors):
+                        continue
+                    
+                    result = task.result()
+                    if not result:
+                        empty_result = result
+                    elif winner is None:
+                        winner = provider, result
+                
+                if winner is not None:
+                    provider, result = winner
+                    logger.info(f"🏁 {self.provider_type.value} race won by {provider.name}")
+                    return result
+        finally:
+            for task in pending:
+                task.cancel()
+            # Let cancelled losers unwind before returning
+            await asyncio.gather(*pending, return_exceptions=True)
+            # A loser may still complete before its cancellation lands;
+            # its outcome is recorded like any other
+            for task in tasks:
+                if task not in settled and task.done() and not task.cancelled():
+                    await self._record_race_outcome(task, tasks[task], errors)
+        
+        if empty_result is not None:
+            return empty_result
+        
+        error_summary = "; ".join([f"{name}: {str(e)[:50]}" for name, e in errors])
+        raise AllProvidersFailedError(
+            f"All {self.provider_type.value} providers failed: {error_summary}"
+        )
+    
+    async def _record_race_outcome(self, task: asyncio.Task, provider: BaseProvider, errors: list) -> bool:
+        """
+        Record a finished race call on its provider's circuit.
+        
+        Mirrors execute(): an open circuit is skipped without counting as a
+        failure, any other exception is recorded as one.
+        
+        Returns:
+            True if the call returned a result
+        """
+        try:
+            task.result()
+        except CircuitOpenError:
+            logger.warning(f"⚡ Circuit open for {provider.name}, skipping")
+            return False
+        except Exception as e:
+            logger.error(f"❌ {provider.name} failed: {str(e)[:100]}")
+            await provider.circuit.record_failure(e)
+            errors.append((provider.name, e))
+            return False
+        
+        await provider.circuit.record_success()
+        return True
+    
     async def execute_with_provider(self, provider_name: str, *args, **kwargs) -> T:
         """Execute using a specific provider (no fallback)"""
         provider = next((p for p in self._providers if p.name == provider_name), None)
@@ -383,6 +467,13 @@ class TTSProvider(BaseProvider):
     
     async def execute(self, text: str) -> bytes:
         return await self.synthesize(text)
+    
+    async def stream_synthesize(self, text: str):
+        """Stream synthesized audio segments (async generator).
+        
+        Providers without a streaming API yield the full clip once.
+        """
+        yield await self.synthesize(text)
 
 
 class CartesiaTTSProvider(TTSProvider):
@@ -401,6 +492,9 @@ class CartesiaTTSProvider(TTSProvider):
     async def synthesize(self, text: str) -> bytes:
         return await self.service.synthesize(text)
     
+    def stream_synthesize(self, text: str):
+        return self.service.synthesize_stream(text)
+    
     async def health_check(self) -> bool:
         return bool(self.service.api_key)
 
@@ -0,0 +1,46 @@
+"""
+Retry Helper
+Retries transient provider errors (timeouts) with exponential backoff.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Tuple, Type, TypeVar
+import httpx
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+async def retry_async(
+    func: Callable[[], Awaitable[T]],
+    attempts: int = 2,
+    base_delay: float = 0.2,
+    max_delay: float = 1.0,
+    retry_on: Tuple[Type[BaseException], ...] = (httpx.TimeoutException,),
+) -> T:
+    """
+    Call an async function, retrying on transient errors.
+    
+    Args:
+        func: Zero-argument callable returning a fresh awaitable per attempt
+        attempts: Total number of attempts (including the first)
+        base_delay: Delay before the first retry in seconds (doubles each retry)
+        max_delay: Upper bound for the delay between retries
+        retry_on: Exception types that trigger a retry
+        
+    Returns:
+        Result of the first successful call
+    """
+    delay = base_delay
+    for attempt in range(1, attempts + 1):
+        try:
+            return await func()
+        except retry_on as e:
+            if attempt == attempts:
+                raise
+            logger.warning(f"🔁 {type(e).__name__} on attempt {attempt}/{attempts}, "
+                           f"retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
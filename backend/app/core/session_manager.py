@@ -129,7 +129,8 @@ class SessionManager:
         session_id: str,
         state: str = None,
         add_message: Dict[str, str] = None,
-        metadata: Dict[str, Any] = None
+        metadata: Dict[str, Any] = None,
+        add_messages: List[Dict[str, str]] = None
     ) -> Optional[SessionData]:
         """
         Update session data.
@@ -139,6 +140,7 @@ class SessionManager:
             state: New state (listening, thinking, speaking)
             add_message: Message to add to history
             metadata: Metadata to merge
+            add_messages: Messages to add to history, in order (one read/write for all)
             
         Returns:
             Updated SessionData
@@ -157,6 +159,9 @@ class SessionManager:
         if add_message:
             session.conversation_history.append(add_message)
         
+        if add_messages:
+            session.conversation_history.extend(add_messages)
+        
         if metadata:
             session.metadata.update(metadata)
         
@@ -2,29 +2,63 @@
 Voice Session with Streaming Support and Audio Metrics
 """
 import asyncio
-import base64
 import logging
 import time
 import io
+import orjson
 import uuid
-from typing import Optional, List, Union
+import wave
+from typing import Optional, List, Tuple, Union
 from fastapi import WebSocket
 from pydub import AudioSegment
+from app.config import settings
 from app.services.stt import DeepgramSTTService
-from app.services.llm import GroqLLMService
+from app.services.llm import GroqLLMService, may_need_search
 from app.services.tts import CartesiaTTSService
 from app.services.audio_metrics import AudioMetricsService
-from app.services.vad import VoiceActivityDetector
+from app.services.vad import VoiceActivityDetector, StreamingVAD, create_vad_service
 from app.services.search import search_service
 from app.services.metrics import metrics_collector
 from app.services.stt_streaming import DeepgramStreamingSTT, create_streaming_stt
-from app.core.cache import get_semantic_cache
+from app.core.cache import get_semantic_cache, get_tts_audio_cache
+from app.core.executor import run_blocking
 from app.core.memory import ConversationMemory
 from app.core.provider_manager import ProviderManager, get_stt_manager, get_llm_manager, get_tts_manager
 
 logger = logging.getLogger(__name__)
 
 
+# Binary frames to the client start with a one-byte type tag; JSON stays text
+AUDIO_FRAME_PREFIX = b"\x01"
+
+
+def _dumps(message) -> str:
+    """Serialize an outbound message; metrics may carry numpy scalars."""
+    return orjson.dumps(message, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
+# State changes are the most frequent control message and have a fixed shape,
+# so they're serialized once here instead of on every transition
+_STATE_FRAMES = {
+    state: _dumps({"type": "state_change", "state": state})
+    for state in ("idle", "listening", "thinking", "speaking")
+}
+
+
+def _encode_control(message: dict) -> str:
+    """Serialize a control message, using the prebuilt frame for known states."""
+    if message["type"] == "state_change":
+        frame = _STATE_FRAMES.get(message["state"])
+        if frame is not None:
+            return frame
+    return _dumps(message)
+
+
+def _message_key(message: dict) -> tuple:
+    """Hashable identity for a history message (equal iff the dicts are equal)."""
+    return tuple(sorted(message.items()))
+
+
 class VoiceSessionStreaming:
     """
     Voice Session with True VAD-based Turn Detection
@@ -40,6 +74,10 @@ class VoiceSessionStreaming:
     SILENCE_DURATION = 0.8    # Seconds of silence to trigger processing (optimized for speed)
     MIN_SPEECH_CHUNKS = 1     # Minimum chunks with speech before considering it a turn
     FALLBACK_TIMEOUT = 1.0    # Timeout for fallback mode (when ffprobe unavailable)
+    CLIENT_VAD_TIMEOUT = 2.0  # Safety net if a client-gated turn never gets speech_end
+    CHUNK_LOG_INTERVAL = 20   # Log one INFO summary per this many audio chunks
+    CACHE_CONTEXT_MESSAGES = 4  # History messages an audio cache entry must match
+    PCM_SAMPLE_RATES = (8000, 16000, 24000, 44100, 48000)  # Accepted audio_format rates
     
     def __init__(
         self,
@@ -71,14 +109,21 @@ class VoiceSessionStreaming:
         self.llm_service = llm_service
         self.tts_service = tts_service
         self.audio_metrics_service = audio_metrics_service
-        self.vad_service = vad_service
+        # VAD tracks speech/silence counters, so each session owns its own detector
+        self.vad_service = vad_service or create_vad_service(aggressiveness=2)
+        self.streaming_vad = StreamingVAD(self.vad_service)
         self.user_id = user_id
         
         # Session state
         self.state: str = "idle"
         self.conversation_history: List[dict] = initial_history or []
+        # Keys of the messages already in the store; the history list is appended
+        # to in place, so this snapshot is what tells new messages apart
+        self._prev_ids = {_message_key(m) for m in self.conversation_history}
         self.processing_audio: bool = False
-        self.interrupted: bool = False  # Barge-in interrupt flag
+        # Barge-in: every turn gets a fresh event, so new audio arriving after an
+        # interrupt can never un-interrupt the turn that is still unwinding
+        self._turn_interrupt: asyncio.Event = asyncio.Event()
         
         # Memory and cache
         self.memory = ConversationMemory(session_id=session_id, user_id=user_id)
@@ -91,6 +136,27 @@ class VoiceSessionStreaming:
         self.last_speech_time: float = 0
         self.silence_start_time: float = 0
         self._silence_check_task: Optional[asyncio.Task] = None  # For fallback VAD
+        self._turn_task: Optional[asyncio.Task] = None  # Client-VAD turn in flight
+        
+        # Input format: None = WebM/Opus chunks, otherwise raw 16-bit PCM at this rate
+        self.pcm_sample_rate: Optional[int] = None
+        # True once the client gates PCM with its own VAD (speech_start/speech_end)
+        self.client_vad: bool = False
+        self._chunk_counter: int = 0
+        
+        # Outbound JSON messages are queued and coalesced into array frames
+        self._out_queue: asyncio.Queue = asyncio.Queue()
+        self._sender_task: asyncio.Task = asyncio.create_task(self._sender_loop())
+        
+        # Client control messages: type -> handler taking the parsed message.
+        # Handlers must return quickly; long work (a turn) is started as a task
+        self._control_handlers = {
+            "interrupt": self._on_interrupt_message,
+            "cancel_audio": self._on_cancel_audio_message,
+            "speech_start": lambda data: self.handle_client_speech_start(),
+            "speech_end": lambda data: self.handle_client_speech_end(),
+            "audio_format": self._on_audio_format_message,
+        }
         
         # Real-time streaming STT for live captions
         self.streaming_stt: Optional[DeepgramStreamingSTT] = None
@@ -113,128 +179,482 @@ class VoiceSessionStreaming:
             on_final=on_final
         )
         
-    async def cleanup(self):
-        """Cleanup session resources."""
+    def new_messages(self) -> List[dict]:
+        """History messages added since the session was loaded from the store."""
+        return [
+            msg for msg in self.conversation_history
+            if _message_key(msg) not in self._prev_ids
+        ]
+    
+    async def handle_control_message(self, data: dict) -> bool:
+        """
+        Dispatch a parsed JSON control message from the client.
+        
+        Returns:
+            False if the message type has no handler
+        """
+        handler = self._control_handlers.get(data.get("type"))
+        if handler is None:
+            return False
+        await handler(data)
+        return True
+    
+    async def _on_interrupt_message(self, data: dict):
+        logger.info("🛑 Interrupt command received")
+        await self.handle_interrupt()
+    
+    async def _on_cancel_audio_message(self, data: dict):
+        logger.info("🔇 Cancel audio command received")
+        await self.handle_interrupt()
+    
+    async def _on_audio_format_message(self, data: dict):
+        audio_format = data.get("format", "webm")
+        sample_rate = data.get("sample_rate", settings.SAMPLE_RATE)
+        if audio_format == "pcm16":
+            # bool is an int subclass; "16000" or 16000.5 are rejected too
+            if type(sample_rate) is not int or sample_rate not in self.PCM_SAMPLE_RATES:
+                logger.warning(f"⚠️ Unsupported PCM sample rate {sample_rate!r} - ignoring audio_format")
+                return
+        await self.set_audio_format(audio_format, sample_rate, client_vad=data.get("client_vad") is True)
+    
+    async def set_audio_format(self, audio_format: str, sample_rate: int, client_vad: bool = False):
+        """
+        Switch the session's audio input format.
+        
+        Clients that capture raw PCM announce it before streaming, which lets
+        us skip the WebM decode entirely. Clients that never send this keep
+        the WebM path.
+        
+        PCM clients that gate audio themselves (stream only speech, then send
+        speech_end) announce client_vad. Any other PCM stream is segmented by
+        the server: each chunk runs through the frame-level StreamingVAD.
+        
+        Args:
+            audio_format: "pcm16" for raw 16-bit mono PCM, or "webm"
+            sample_rate: PCM sample rate in Hz
+            client_vad: True if the client gates PCM with its own VAD
+        """
+        if audio_format == "pcm16":
+            self.pcm_sample_rate = sample_rate
+            self.client_vad = client_vad
+            logger.info(f"🎚️ Session {self.session_id[:8]} streaming raw PCM @ {sample_rate}Hz "
+                        f"({'client' if client_vad else 'server'} VAD)")
+            if not client_vad and sample_rate != self.vad_service.sample_rate:
+                logger.warning(f"⚠️ Server VAD runs at {self.vad_service.sample_rate}Hz - "
+                               f"falling back to RMS silence detection for {sample_rate}Hz PCM")
+        elif audio_format == "webm":
+            self.pcm_sample_rate = None
+            self.client_vad = False
+        else:
+            logger.warning(f"⚠️ Unsupported audio format '{audio_format}' - keeping current format")
+            return
+        
+        self.streaming_vad.reset()
+        
         if self.streaming_stt:
-            await self.streaming_stt.finalize()
-            await self.streaming_stt.disconnect()
-            self.streaming_stt = None
-        logger.info(f"🧹 Session {self.session_id[:8]} cleaned up")
+            self.streaming_stt.set_pcm_input(self.pcm_sample_rate)
+            # Reconnect lazily on the next chunk with the PCM encoding params
+            if self.streaming_stt.is_connected:
+                await self.streaming_stt.disconnect()
+        
+    async def handle_client_speech_start(self):
+        """Client VAD detected speech; the PCM that follows is already gated."""
+        self.client_vad = True
+        self._cancel_silence_check()
+        logger.debug("🎙️ Client speech start")
+    
+    async def handle_client_speech_end(self):
+        """
+        Client VAD detected the end of an utterance.
         
+        Starts the turn right away instead of waiting for server-side
+        silence detection, since a gated client stops sending audio. The
+        turn runs as its own task so control dispatch (e.g. an interrupt)
+        is never stuck behind STT->LLM->TTS.
+        """
+        self._cancel_silence_check()
+        await self.send_vad_status(is_speech=False, speech_ended=True)
+        if self.audio_chunks and self.state != "speaking":
+            logger.info(f"✅ Client speech end: processing {len(self.audio_chunks)} chunks")
+            self._start_turn()
+    
+    def _start_turn(self):
+        """Process the accumulated audio in a background task (one turn at a time)."""
+        if self._turn_task and not self._turn_task.done():
+            return
+        self._turn_interrupt = asyncio.Event()
+        self._turn_task = asyncio.create_task(self._process_accumulated_audio())
+    
+    @property
+    def _interrupted(self) -> bool:
+        """Whether the current turn was interrupted (polled per token/chunk)."""
+        return self._turn_interrupt.is_set()
+    
+    def _enqueue(self, message: dict):
+        """Queue a message for the sender task."""
+        self._out_queue.put_nowait(message)
+    
+    async def _sender_loop(self):
+        """Send queued messages, coalescing whatever is already waiting."""
+        while True:
+            batch = [await self._out_queue.get()]
+            while True:
+                try:
+                    batch.append(self._out_queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            await self._send_batch(batch)
+    
+    async def _send_batch(self, batch: List[dict]):
+        """
+        Send a batch in order: consecutive control messages go out as one
+        JSON array frame, audio messages each go out as a tagged binary frame.
+        """
+        pending: List[dict] = []
+        for message in batch + [None]:
+            if message is not None and message["type"] != "audio":
+                pending.append(message)
+                continue
+            
+            try:
+                if pending:
+                    if len(pending) == 1:
+                        frame = _encode_control(pending[0])
+                    else:
+                        frame = "[" + ",".join(map(_encode_control, pending)) + "]"
+                    await self.websocket.send_text(frame)
+                    pending = []
+                if message is not None:
+                    await self.websocket.send_bytes(AUDIO_FRAME_PREFIX + message["data"])
+            except Exception as e:
+                pending = []
+                logger.error(f"Error sending to client: {e}")
+    
+    def _discard_queued_audio(self):
+        """Drop audio that hasn't been sent yet, keeping queued control messages."""
+        pending = []
+        while not self._out_queue.empty():
+            pending.append(self._out_queue.get_nowait())
+        for message in pending:
+            if message["type"] != "audio":
+                self._out_queue.put_nowait(message)
+    
+    async def _stop_sender(self):
+        """Flush queued messages and stop the sender task."""
+        self._sender_task.cancel()
+        try:
+            await self._sender_task
+        except asyncio.CancelledError:
+            pass
+        
+        pending = []
+        while not self._out_queue.empty():
+            pending.append(self._out_queue.get_nowait())
+        if pending:
+            await self._send_batch(pending)
+    
     async def send_state_update(self, state: str):
         """Send state update to frontend"""
         self.state = state
-        try:
-            await self.websocket.send_json({
-                "type": "state_change",
-                "state": state
-            })
-        except Exception as e:
-            logger.error(f"Error sending state: {e}")
+        self._enqueue({
+            "type": "state_change",
+            "state": state
+        })
     
     async def send_transcript_update(self, speaker: str, text: str, is_final: bool = True, message_id: str = None):
         """Send transcript update to frontend"""
-        try:
-            if not message_id:
-                message_id = f"{speaker}_{int(time.time()*1000)}"
-                
-            await self.websocket.send_json({
-                "type": "transcript_update",
-                "data": {
-                    "id": message_id,
-                    "speaker": speaker,
-                    "text": text,
-                    "timestamp": time.time(),
-                    "is_final": is_final
-                }
-            })
-        except Exception as e:
-            logger.error(f"Error sending transcript: {e}")
+        if not message_id:
+            message_id = f"{speaker}_{int(time.time()*1000)}"
+            
+        self._enqueue({
+            "type": "transcript_update",
+            "data": {
+                "id": message_id,
+                "speaker": speaker,
+                "text": text,
+                "timestamp": time.time(),
+                "is_final": is_final
+            }
+        })
     
     async def send_interim_transcript(self, text: str, message_id: str = None):
         """
         Send interim (partial) transcript for real-time word-by-word display.
         This shows text as the user speaks, like live video captions.
         """
-        try:
-            if not message_id:
-                message_id = f"user_interim_{int(time.time()*1000)}"
-                
-            await self.websocket.send_json({
-                "type": "interim_transcript",
-                "data": {
-                    "id": message_id,
-                    "speaker": "user",
-                    "text": text,
-                    "timestamp": time.time(),
-                    "is_final": False
-                }
-            })
-        except Exception as e:
-            logger.error(f"Error sending interim transcript: {e}")
+        if not message_id:
+            message_id = f"user_interim_{int(time.time()*1000)}"
+            
+        self._enqueue({
+            "type": "interim_transcript",
+            "data": {
+                "id": message_id,
+                "speaker": "user",
+                "text": text,
+                "timestamp": time.time(),
+                "is_final": False
+            }
+        })
     
     async def send_audio_metrics(self, metrics: dict):
         """Send audio quality metrics to frontend"""
-        try:
-            await self.websocket.send_json({
-                "type": "audio_metrics",
-                "data": metrics
-            })
-        except Exception as e:
-            logger.error(f"Error sending metrics: {e}")
+        self._enqueue({
+            "type": "audio_metrics",
+            "data": metrics
+        })
     
     async def send_vad_status(self, is_speech: bool, speech_ended: bool = False):
         """Send VAD status to frontend"""
-        try:
-            await self.websocket.send_json({
-                "type": "vad_status",
-                "data": {
-                    "is_speech": is_speech,
-                    "speech_ended": speech_ended
-                }
-            })
-        except Exception as e:
-            logger.error(f"Error sending VAD status: {e}")
+        self._enqueue({
+            "type": "vad_status",
+            "data": {
+                "is_speech": is_speech,
+                "speech_ended": speech_ended
+            }
+        })
     
     async def send_error(self, error_message: str):
         """Send error to frontend"""
+        self._enqueue({
+            "type": "error",
+            "message": error_message
+        })
+    
+    async def send_audio(self, audio_data: bytes):
+        """Send a synthesized audio clip to frontend"""
+        self._enqueue({
+            "type": "audio",
+            "data": audio_data
+        })
+    
+    async def _synthesize_and_send(self, text: str, audio_out: Optional[List[bytes]] = None) -> bool:
+        """
+        Synthesize text and forward audio to the client as it is generated.
+        
+        Streams from the current TTS provider so playback can start before the
+        whole sentence is rendered. If the stream fails before any audio was
+        sent, falls back to the provider manager (with circuit breaker).
+        
+        Args:
+            text: Text to speak
+            audio_out: Optional list that every sent audio segment is appended to
+            
+        Returns:
+            True only if the whole sentence was spoken; False if TTS failed
+            (even partway) or was interrupted, so its audio mustn't be cached
+        """
+        sent_audio = False
+        audio_stream = None
+        
+        async def forward_stream():
+            nonlocal sent_audio
+            async for audio_data in audio_stream:
+                if self._interrupted:
+                    break
+                if audio_data:
+                    await self.send_audio(audio_data)
+                    sent_audio = True
+                    if audio_out is not None:
+                        audio_out.append(audio_data)
+        
         try:
-            await self.websocket.send_json({
-                "type": "error",
-                "message": error_message
-            })
+            if self.use_provider_managers:
+                tts_provider = self.tts_manager.current_provider
+                if not tts_provider:
+                    raise Exception("No TTS provider available")
+                audio_stream = tts_provider.stream_synthesize(text)
+            else:
+                audio_stream = self.tts_service.synthesize_stream(text)
+            
+            # A stalled provider would otherwise hold the turn until its next chunk
+            await self._until_interrupted(forward_stream())
+            return sent_audio and not self._interrupted
         except Exception as e:
-            logger.error(f"Error sending error: {e}")
+            if sent_audio or not self.use_provider_managers:
+                logger.error(f"TTS error: {e}")
+                return False
+            logger.warning(f"TTS stream failed, retrying with fallback: {e}")
+        finally:
+            if audio_stream is not None:
+                # Release the HTTP stream early if we stopped on interrupt
+                await audio_stream.aclose()
+        
+        try:
+            audio_data = await self.tts_manager.execute(text)
+            if audio_data and not self._interrupted:
+                await self.send_audio(audio_data)
+                if audio_out is not None:
+                    audio_out.append(audio_data)
+                return True
+        except Exception as e:
+            logger.error(f"TTS error: {e}")
+        return False
+    
+    def _start_tts_worker(self, audio_out: List[bytes]) -> Tuple[asyncio.Queue, asyncio.Task]:
+        """
+        Start a task that speaks queued sentences in order.
+        
+        The LLM loop queues each sentence and keeps reading tokens while the
+        previous one is synthesized, so a turn takes about max(LLM, TTS)
+        rather than their sum. Sentences still queued after an interrupt
+        are skipped. Queue None to finish, then await the task.
+        
+        Args:
+            audio_out: List that every sent audio segment is appended to
+            
+        Returns:
+            Tuple of (sentence queue, worker task). The task's result is True
+            only if every queued sentence was spoken in full.
+        """
+        sentences: asyncio.Queue = asyncio.Queue()
+        interrupt = self._turn_interrupt
+        
+        async def speak_sentences() -> bool:
+            complete = True
+            while (sentence := await sentences.get()) is not None:
+                if interrupt.is_set():
+                    # Drain the rest of this turn's sentences without speaking
+                    complete = False
+                    continue
+                if not await self._synthesize_and_send(sentence, audio_out):
+                    complete = False
+            return complete
+        
+        return sentences, asyncio.create_task(speak_sentences())
+    
+    def _cache_context(self) -> tuple:
+        """Fingerprint of the recent history before the current user message."""
+        recent = self.conversation_history[-1 - self.CACHE_CONTEXT_MESSAGES:-1]
+        return tuple(_message_key(m) for m in recent)
+    
+    async def _cache_response_audio(self, transcript: str, response: str, audio: List[bytes], context: tuple):
+        """Store a fully spoken answer for replay; time-sensitive questions are skipped."""
+        if may_need_search(transcript):
+            return
+        try:
+            await get_tts_audio_cache().put(transcript, response, audio, context)
+        except Exception as e:
+            logger.warning(f"Failed to cache response audio: {e}")
+    
+    async def _replay_cached_audio(self, transcript: str, correlation_id: str, context: tuple) -> bool:
+        """
+        Answer from the TTS audio cache if a similar utterance was seen before
+        in the same conversation context.
+        
+        On a hit the cached response text and audio are sent as-is, skipping
+        both the LLM and TTS. Questions that may need a web search are never
+        answered from cache.
+        
+        Returns:
+            True if the turn was answered from cache
+        """
+        if may_need_search(transcript):
+            return False
+        try:
+            audio_hit = await get_tts_audio_cache().get(transcript, context)
+        except Exception as e:
+            logger.warning(f"Audio cache lookup failed: {e}")
+            return False
+        
+        if not audio_hit:
+            return False
+        
+        cached_response = audio_hit["response"]
+        logger.info(f"⚡ [{correlation_id}] Replaying cached audio (similarity={audio_hit['similarity']:.3f})")
+        
+        await self.send_state_update("speaking")
+        assistant_msg_id = f"assistant_{int(time.time()*1000)}"
+        await self.send_transcript_update("assistant", cached_response, is_final=True, message_id=assistant_msg_id)
+        
+        for audio_data in audio_hit["audio"]:
+            if self._interrupted:
+                break
+            await self.send_audio(audio_data)
+        
+        self.conversation_history.append({"role": "assistant", "content": cached_response})
+        
+        # Save to memory
+        try:
+            await self.memory.save_message(
+                role="assistant",
+                content=cached_response,
+                metadata={"correlation_id": correlation_id, "cached": True}
+            )
+        except Exception as e:
+            logger.warning(f"Failed to save cached response: {e}")
+        
+        metrics_collector.end_request(correlation_id, success=True, used_search=False)
+        await self.send_state_update("listening")
+        return True
+    
+    async def _until_interrupted(self, coro):
+        """
+        Run a coroutine, cancelling it as soon as an interrupt arrives.
+        
+        Returns:
+            The coroutine's result, or None if it was interrupted
+        """
+        interrupt = self._turn_interrupt
+        if interrupt.is_set():
+            coro.close()
+            return None
+        
+        task = asyncio.ensure_future(coro)
+        waiter = asyncio.ensure_future(interrupt.wait())
+        try:
+            await asyncio.wait({task, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        
+        if task.cancelled():
+            return None
+        return task.result()
     
     async def handle_interrupt(self):
         """Handle barge-in interrupt from user"""
         logger.info("🛑 Interrupt received - stopping TTS")
-        self.interrupted = True
+        self._turn_interrupt.set()
         self.processing_audio = False
+        self._discard_queued_audio()
         
         # Send interrupt acknowledgment to frontend
-        try:
-            await self.websocket.send_json({
-                "type": "interrupt_ack",
-                "message": "Playback stopped"
-            })
-        except Exception as e:
-            logger.error(f"Error sending interrupt ack: {e}")
+        self._enqueue({
+            "type": "interrupt_ack",
+            "message": "Playback stopped"
+        })
         
         # Transition back to listening state
         await self.send_state_update("listening")
     
-    def reset_interrupt(self):
-        """Reset interrupt flag for new turn"""
-        self.interrupted = False
-
-
+    async def _execute_stt(self, audio_data: bytes) -> str:
+        """Transcribe via the STT manager, racing all providers if STT_RACE_MODE is on."""
+        if settings.STT_RACE_MODE:
+            return await self.stt_manager.execute_race(audio_data)
+        return await self.stt_manager.execute(audio_data)
+    
     def _is_valid_webm(self, audio_data: bytes) -> bool:
         """Check if audio data has a valid WebM EBML header"""
         if len(audio_data) < 4:
             return False
         return audio_data[:4] == b'\x1a\x45\xdf\xa3'
     
+    def _is_pcm_chunk(self, audio_data: bytes) -> bool:
+        """Raw PCM once the client announced it; PTT recordings stay WebM."""
+        return self.pcm_sample_rate is not None and not self._is_valid_webm(audio_data)
+    
+    def _pcm_to_wav(self, pcm_data: bytes) -> bytes:
+        """Wrap raw 16-bit mono PCM in a WAV header for batch STT."""
+        output = io.BytesIO()
+        with wave.open(output, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.pcm_sample_rate)
+            wav.writeframes(pcm_data)
+        return output.getvalue()
+    
     def _check_ffprobe_available(self) -> bool:
         """Check if ffprobe is available on the system."""
         import shutil
@@ -253,7 +673,7 @@ class VoiceSessionStreaming:
                 elapsed = time.time() - self.last_speech_time
                 if elapsed >= timeout - 0.1:  # Small margin for timing
                     logger.info(f"⏱️ Silence timeout ({elapsed:.1f}s): Processing {len(self.audio_chunks)} chunks")
-                    await self._process_accumulated_audio()
+                    self._start_turn()
         except asyncio.CancelledError:
             # Task was cancelled (new chunk arrived), that's expected
             pass
@@ -325,7 +745,7 @@ class VoiceSessionStreaming:
                     return None
                 try:
                     if self.use_provider_managers:
-                        return await self.stt_manager.execute(chunk)
+                        return await self._execute_stt(chunk)
                     return await self.stt_service.transcribe(chunk)
                 except Exception as e:
                     logger.warning(f"Chunk {i} failed: {e}")
@@ -369,6 +789,10 @@ class VoiceSessionStreaming:
             except Exception as e:
                 logger.warning(f"Failed to save user message: {e}")
             
+            cache_context = self._cache_context()
+            if await self._replay_cached_audio(transcript, correlation_id, cache_context):
+                return
+            
             # LLM streaming
             logger.info(f"🤖 [{correlation_id}] LLM streaming...")
             metrics_collector.start_stage(correlation_id, "llm")
@@ -376,6 +800,7 @@ class VoiceSessionStreaming:
             full_response = ""
             sentence_buffer = ""
             first_audio_sent = False
+            response_audio: List[bytes] = []
             assistant_msg_id = f"assistant_{int(time.time()*1000)}"
             
             # Get token generator
@@ -388,61 +813,55 @@ class VoiceSessionStreaming:
             else:
                 token_generator = self.llm_service.stream_complete(self.conversation_history)
             
-            async for token in token_generator:
-                if self.interrupted:
-                    logger.info("🛑 Interrupted during LLM streaming")
-                    break
-                
-                full_response += token
-                sentence_buffer += token
-                
-                await self.send_transcript_update("assistant", full_response, is_final=False, message_id=assistant_msg_id)
-                
-                if token in ['.', '!', '?', '\n'] and len(sentence_buffer.strip()) > 10:
-                    if self.interrupted:
+            # Sentences are spoken by a worker while tokens keep streaming
+            tts_queue, tts_task = self._start_tts_worker(response_audio)
+            try:
+                async for token in token_generator:
+                    if self._interrupted:
+                        logger.info("🛑 Interrupted during LLM streaming")
                         break
                     
-                    if not first_audio_sent:
-                        await self.send_state_update("speaking")
-                        first_audio_sent = True
+                    full_response += token
+                    sentence_buffer += token
                     
-                    sentence = sentence_buffer.strip()
-                    logger.info(f"🔊 TTS: {sentence[:50]}...")
+                    await self.send_transcript_update("assistant", full_response, is_final=False, message_id=assistant_msg_id)
                     
-                    try:
-                        if self.use_provider_managers:
-                            audio_data = await self.tts_manager.execute(sentence)
-                        else:
-                            audio_data = await self.tts_service.synthesize(sentence)
-                        if audio_data and not self.interrupted:
-                            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-                            await self.websocket.send_json({"type": "audio", "data": audio_base64})
-                    except Exception as e:
-                        logger.error(f"TTS error: {e}")
+                    if token in ['.', '!', '?', '\n'] and len(sentence_buffer.strip()) > 10:
+                        if self._interrupted:
+                            break
+                        
+                        if not first_audio_sent:
+                            await self.send_state_update("speaking")
+                            first_audio_sent = True
+                        
+                        sentence = sentence_buffer.strip()
+                        logger.info(f"🔊 TTS: {sentence[:50]}...")
+                        tts_queue.put_nowait(sentence)
+                        
+                        sentence_buffer = ""
+                
+                metrics_collector.end_stage(correlation_id, "llm")
+                
+                # Final sentence
+                if sentence_buffer.strip() and not self._interrupted:
+                    if not first_audio_sent:
+                        await self.send_state_update("speaking")
+                    tts_queue.put_nowait(sentence_buffer.strip())
                     
-                    sentence_buffer = ""
-            
-            metrics_collector.end_stage(correlation_id, "llm")
-            
-            # Final sentence
-            if sentence_buffer.strip() and not self.interrupted:
-                if not first_audio_sent:
-                    await self.send_state_update("speaking")
-                try:
-                    if self.use_provider_managers:
-                        audio_data = await self.tts_manager.execute(sentence_buffer.strip())
-                    else:
-                        audio_data = await self.tts_service.synthesize(sentence_buffer.strip())
-                    if audio_data and not self.interrupted:
-                        audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-                        await self.websocket.send_json({"type": "audio", "data": audio_base64})
-                except Exception as e:
-                    logger.error(f"TTS error: {e}")
+                tts_queue.put_nowait(None)
+                audio_complete = await tts_task
+            finally:
+                # No-op once the worker finished; stops it if the turn failed
+                tts_task.cancel()
             
             # Finalize
             await self.send_transcript_update("assistant", full_response, is_final=True, message_id=assistant_msg_id)
             self.conversation_history.append({"role": "assistant", "content": full_response})
             
+            # Only cache audio that covers the whole answer with real speech
+            if audio_complete and not self._interrupted and len(full_response) > 20:
+                await self._cache_response_audio(transcript, full_response, response_audio, cache_context)
+            
             try:
                 await self.memory.save_message(role="assistant", content=full_response, metadata={"correlation_id": correlation_id})
             except Exception as e:
@@ -458,13 +877,25 @@ class VoiceSessionStreaming:
     async def process_audio_chunk(self, audio_data: bytes):
         """Process incoming audio chunk with true VAD."""
         try:
+            is_pcm = self._is_pcm_chunk(audio_data)
+            
+            # Chunks arrive several times a second; log a sampled summary only
+            self._chunk_counter += 1
+            if self._chunk_counter % self.CHUNK_LOG_INTERVAL == 0:
+                logger.info("📩 Session %s: %d audio chunks received (latest %d bytes)",
+                            self.session_id[:8], self._chunk_counter, len(audio_data))
+            
             # BARGE-IN: If user sends audio while AI is speaking, interrupt!
             if self.state == "speaking":
                 chunk_size = len(audio_data)
-                # Only trigger for significant audio (not tiny fragments)
-                if chunk_size > 500:
+                # Only trigger for significant audio (not tiny fragments).
+                # PCM streams continuously, so it must also carry speech energy.
+                if is_pcm and self.audio_metrics_service:
+                    significant = self.audio_metrics_service.pcm_rms(audio_data) > self.SILENCE_THRESHOLD
+                else:
+                    significant = chunk_size > 500
+                if significant:
                     logger.info(f"🛑 BARGE-IN: Audio received while speaking ({chunk_size} bytes) - interrupting!")
-                    self.interrupted = True
                     await self.handle_interrupt()
                     # Queue this audio chunk for processing after interrupt
                     self.audio_chunks = [audio_data]
@@ -480,7 +911,7 @@ class VoiceSessionStreaming:
             
             chunk_size = len(audio_data)
             
-            if not self._is_valid_webm(audio_data):
+            if not is_pcm and not self._is_valid_webm(audio_data):
                 logger.warning(f"⚠️ Invalid WebM header")
                 return
             
@@ -490,7 +921,12 @@ class VoiceSessionStreaming:
             using_fallback = False
             
             if self.audio_metrics_service:
-                metrics = self.audio_metrics_service.analyze(audio_data)
+                if is_pcm:
+                    # No decode needed for raw PCM
+                    metrics = self.audio_metrics_service.analyze_pcm(audio_data)
+                else:
+                    # Decoding blocks for tens of ms; keep it off the event loop
+                    metrics = await self.audio_metrics_service.analyze_async(audio_data)
                 if metrics["quality_score"] > 0:
                     await self.send_audio_metrics(metrics)
                     
@@ -506,6 +942,14 @@ class VoiceSessionStreaming:
             else:
                 using_fallback = True
                 is_speech = True
+            
+            # Ungated raw PCM: confirm speech with frame-level WebRTC VAD (no decode needed)
+            if is_pcm and not self.client_vad and self.pcm_sample_rate == self.vad_service.sample_rate:
+                vad_speaking = False
+                async for event in self.streaming_vad.feed(audio_data):
+                    vad_speaking = vad_speaking or event.is_speaking
+                is_speech = vad_speaking
+                using_fallback = False
 
             # Forward audio to streaming STT for real-time live captions
             if self.streaming_stt:
@@ -523,16 +967,25 @@ class VoiceSessionStreaming:
             # PUSH-TO-TALK DETECTION: Large chunk = process immediately
             # PTT sends all audio at once (~14-15KB), while VAD sends 1.5s chunks (~2-3KB)
             LARGE_CHUNK_THRESHOLD = 10000
-            if chunk_size > LARGE_CHUNK_THRESHOLD:
+            if not is_pcm and chunk_size > LARGE_CHUNK_THRESHOLD:
                 logger.info(f"📦 Large chunk detected ({chunk_size} bytes) - likely Push-to-Talk")
                 self.audio_chunks.append(audio_data)
                 await self.send_vad_status(is_speech=True)
-                await self._process_accumulated_audio()
+                self._start_turn()
                 return
             
             # Store the chunk for VAD mode
             self.audio_chunks.append(audio_data)
             
+            # CLIENT VAD MODE: browser only streams speech and signals speech_end
+            if self.client_vad and is_pcm:
+                self.speech_detected = True
+                self.speech_chunk_count += 1
+                self.last_speech_time = now
+                await self.send_vad_status(is_speech=True)
+                self._schedule_silence_check(timeout=self.CLIENT_VAD_TIMEOUT)
+                return
+            
             # FALLBACK MODE: Silence timeout-based processing (since we can't detect silence via RMS)
             if using_fallback:
                 self.speech_detected = True
@@ -543,7 +996,7 @@ class VoiceSessionStreaming:
                 # Schedule silence check - will be cancelled if another chunk arrives
                 # If no more chunks arrive within FALLBACK_TIMEOUT, audio will be processed
                 self._schedule_silence_check(timeout=self.FALLBACK_TIMEOUT)
-                logger.info(f"📦 Fallback mode: {len(self.audio_chunks)} chunks (waiting for silence)")
+                logger.debug("📦 Fallback mode: %d chunks (waiting for silence)", len(self.audio_chunks))
                 return
             
             # NORMAL MODE: RMS-based speech detection
@@ -554,7 +1007,7 @@ class VoiceSessionStreaming:
                 self.silence_start_time = 0
                 
                 await self.send_vad_status(is_speech=True)
-                logger.info(f"🗣️ Speech (RMS={current_rms:.3f}, total chunks={len(self.audio_chunks)})")
+                logger.debug("🗣️ Speech (RMS=%.3f, total chunks=%d)", current_rms, len(self.audio_chunks))
                 
             else:
                 await self.send_vad_status(is_speech=False)
@@ -565,11 +1018,11 @@ class VoiceSessionStreaming:
                         logger.info(f"🔇 Silence started (accumulated {len(self.audio_chunks)} chunks)")
                     
                     silence_duration = now - self.silence_start_time
-                    logger.info(f"⏱️ Silence: {silence_duration:.1f}s / {self.SILENCE_DURATION}s")
+                    logger.debug("⏱️ Silence: %.1fs / %ss", silence_duration, self.SILENCE_DURATION)
                     
                     if silence_duration >= self.SILENCE_DURATION:
                         logger.info(f"✅ Processing {len(self.audio_chunks)} chunks")
-                        await self._process_accumulated_audio()
+                        self._start_turn()
 
                 
         except Exception as e:
@@ -594,7 +1047,11 @@ class VoiceSessionStreaming:
         
         try:
             logger.info(f"📦 Processing {len(chunks_to_process)} audio chunks...")
-            audio_to_process = self._concatenate_audio_chunks(chunks_to_process)
+            if self.pcm_sample_rate and not any(map(self._is_valid_webm, chunks_to_process)):
+                # Raw PCM concatenates byte-for-byte; just add a WAV header
+                audio_to_process = self._pcm_to_wav(b"".join(chunks_to_process))
+            else:
+                audio_to_process = await run_blocking(self._concatenate_audio_chunks, chunks_to_process)
             
             if audio_to_process:
                 # ffprobe available - use concatenated audio
@@ -643,7 +1100,7 @@ class VoiceSessionStreaming:
             try:
                 if self.use_provider_managers:
                     # Use provider manager with automatic fallback
-                    transcript = await self.stt_manager.execute(audio_bytes)
+                    transcript = await self._execute_stt(audio_bytes)
                     current_stt = self.stt_manager.current_provider.name if self.stt_manager.current_provider else "unknown"
                     logger.info(f"📝 [{correlation_id}] STT ({current_stt}): '{transcript}'")
                 else:
@@ -685,7 +1142,12 @@ class VoiceSessionStreaming:
             except Exception as e:
                 logger.warning(f"Failed to save user message: {e}")
             
-            # Check semantic cache FIRST (before search/LLM)
+            # Check cached response audio FIRST (skips LLM and TTS entirely)
+            cache_context = self._cache_context()
+            if await self._replay_cached_audio(transcript, correlation_id, cache_context):
+                return
+            
+            # Check semantic cache next (before search/LLM)
             cache_hit = None
             try:
                 cache = await get_semantic_cache()
@@ -706,21 +1168,12 @@ class VoiceSessionStreaming:
                 await self.send_transcript_update("assistant", cached_response, is_final=True, message_id=assistant_msg_id)
                 
                 # Generate TTS for cached response
-                if not self.interrupted:
-                    try:
-                        # Use provider manager for TTS with fallback
-                        if self.use_provider_managers:
-                            audio_data = await self.tts_manager.execute(cached_response)
-                        else:
-                            audio_data = await self.tts_service.synthesize(cached_response)
-                        if audio_data and not self.interrupted:
-                            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-                            await self.websocket.send_json({
-                                "type": "audio",
-                                "data": audio_base64
-                            })
-                    except Exception as e:
-                        logger.error(f"TTS error for cached response: {e}")
+                response_audio: List[bytes] = []
+                audio_complete = False
+                if not self._interrupted:
+                    audio_complete = await self._synthesize_and_send(cached_response, response_audio)
+                if audio_complete and not self._interrupted:
+                    await self._cache_response_audio(transcript, cached_response, response_audio, cache_context)
                 
                 self.conversation_history.append({"role": "assistant", "content": cached_response})
                 
@@ -761,6 +1214,7 @@ class VoiceSessionStreaming:
             full_response = ""
             sentence_buffer = ""
             first_audio_sent = False
+            response_audio: List[bytes] = []
             
             assistant_msg_id = f"assistant_{int(time.time()*1000)}"
             
@@ -797,72 +1251,54 @@ class VoiceSessionStreaming:
                 else:
                     token_generator = self.llm_service.stream_complete(self.conversation_history)
             
-            async for token in token_generator:
-                # Check for interrupt on EVERY token
-                if self.interrupted:
-                    logger.info("🛑 Interrupted during LLM streaming - breaking")
-                    break
-                
-                full_response += token
-                sentence_buffer += token
-                
-                await self.send_transcript_update("assistant", full_response, is_final=False, message_id=assistant_msg_id)
-                
-                if token in ['.', '!', '?', '\n'] and len(sentence_buffer.strip()) > 10:
-                    # Double-check interrupt before TTS
-                    if self.interrupted:
-                        logger.info("🛑 Interrupted before TTS")
+            # Sentences are spoken by a worker while tokens keep streaming
+            tts_queue, tts_task = self._start_tts_worker(response_audio)
+            try:
+                async for token in token_generator:
+                    # Check for interrupt on EVERY token
+                    if self._interrupted:
+                        logger.info("🛑 Interrupted during LLM streaming - breaking")
                         break
                     
+                    full_response += token
+                    sentence_buffer += token
+                    
+                    await self.send_transcript_update("assistant", full_response, is_final=False, message_id=assistant_msg_id)
+                    
+                    if token in ['.', '!', '?', '\n'] and len(sentence_buffer.strip()) > 10:
+                        # Double-check interrupt before TTS
+                        if self._interrupted:
+                            logger.info("🛑 Interrupted before TTS")
+                            break
+                        
+                        if not first_audio_sent:
+                            await self.send_state_update("speaking")
+                            first_audio_sent = True
+                        
+                        sentence = sentence_buffer.strip()
+                        logger.info(f"🔊 TTS: {sentence[:50]}...")
+                        tts_queue.put_nowait(sentence)
+                        
+                        sentence_buffer = ""
+                
+                # Only process remaining buffer if NOT interrupted
+                if sentence_buffer.strip() and not self._interrupted:
                     if not first_audio_sent:
                         await self.send_state_update("speaking")
-                        first_audio_sent = True
                     
-                    sentence = sentence_buffer.strip()
-                    logger.info(f"🔊 TTS: {sentence[:50]}...")
+                    tts_queue.put_nowait(sentence_buffer.strip())
                     
-                    try:
-                        # Use provider manager for TTS with fallback
-                        if self.use_provider_managers:
-                            audio_data = await self.tts_manager.execute(sentence)
-                        else:
-                            audio_data = await self.tts_service.synthesize(sentence)
-                        if audio_data and not self.interrupted:
-                            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-                            await self.websocket.send_json({
-                                "type": "audio",
-                                "data": audio_base64
-                            })
-                    except Exception as e:
-                        logger.error(f"TTS error: {e}")
-                    
-                    sentence_buffer = ""
-            
-            # Only process remaining buffer if NOT interrupted
-            if sentence_buffer.strip() and not self.interrupted:
-                if not first_audio_sent:
-                    await self.send_state_update("speaking")
-                
-                try:
-                    # Use provider manager for TTS with fallback
-                    if self.use_provider_managers:
-                        audio_data = await self.tts_manager.execute(sentence_buffer.strip())
-                    else:
-                        audio_data = await self.tts_service.synthesize(sentence_buffer.strip())
-                    if audio_data and not self.interrupted:
-                        audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-                        await self.websocket.send_json({
-                            "type": "audio",
-                            "data": audio_base64
-                        })
-                except Exception as e:
-                    logger.error(f"TTS error: {e}")
+                tts_queue.put_nowait(None)
+                audio_complete = await tts_task
+            finally:
+                # No-op once the worker finished; stops it if the turn failed
+                tts_task.cancel()
             
             # End LLM timing (includes streaming + TTS interleaved)
             metrics_collector.end_stage(correlation_id, "llm")
             
             # Only add to history if NOT interrupted
-            if not self.interrupted:
+            if not self._interrupted:
                 await self.send_transcript_update("assistant", full_response, is_final=True, message_id=assistant_msg_id)
                 self.conversation_history.append({"role": "assistant", "content": full_response})
                 logger.info(f"✅ [{correlation_id}] Done: {full_response[:80]}...")
@@ -879,6 +1315,8 @@ class VoiceSessionStreaming:
                         )
                     except Exception as e:
                         logger.warning(f"Failed to cache response: {e}")
+                    if audio_complete:
+                        await self._cache_response_audio(transcript, full_response, response_audio, cache_context)
                 
                 # Save assistant message to memory
                 try:
@@ -906,7 +1344,15 @@ class VoiceSessionStreaming:
     
     async def cleanup(self):
         """Cleanup session resources"""
-        logger.info(f"Cleaning up {self.session_id}")
+        if self._turn_task and not self._turn_task.done():
+            self._turn_task.cancel()
+            await asyncio.gather(self._turn_task, return_exceptions=True)
         self.audio_chunks.clear()
         self.speech_detected = False
         self.speech_chunk_count = 0
+        if self.streaming_stt:
+            await self.streaming_stt.finalize()
+            await self.streaming_stt.disconnect()
+            self.streaming_stt = None
+        await self._stop_sender()
+        logger.info(f"🧹 Session {self.session_id[:8]} cleaned up")
@@ -2,7 +2,7 @@ from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query, HTTPExceptio
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional
-from app.websocket import handle_voice_session
+from app.websocket import handle_voice_session, register_voice_providers
 from app.config import settings
 from app.core.redis import redis_manager
 from app.core.session_manager import session_manager
@@ -10,8 +10,9 @@ from app.core.auth import create_token, create_guest_token, authenticate_websock
 from app.core.tasks import background_tasks
 from app.services.metrics import metrics_collector
 from app.models.database import init_db, close_db
-from app.core.cache import get_semantic_cache
+from app.core.cache import get_semantic_cache, get_tts_audio_cache
 from app.core.cache_warmer import warm_cache
+from app.core.http_client import close_http_client
 import logging
 import asyncio
 
@@ -277,6 +278,12 @@ async def startup_event():
     logger.info("Starting Voice Assistant API...")
     logger.info(f"Environment: {settings.ENVIRONMENT}")
     
+    # Websocket I/O relies on uvloop; the launch commands pass --loop uvloop
+    if settings.DEBUG:
+        loop_type = type(asyncio.get_running_loop())
+        if not loop_type.__module__.startswith("uvloop"):
+            logger.warning(f"⚠️ Running on {loop_type.__module__}.{loop_type.__name__}, not uvloop - start with --loop uvloop")
+    
     # Initialize database
     try:
         await init_db()
@@ -298,6 +305,9 @@ async def startup_event():
     else:
         logger.warning("⚠️ Redis not available, using in-memory fallback")
     
+    # Register STT/LLM/TTS providers so status endpoints see them before the first session
+    register_voice_providers()
+    
     # Start background tasks
     await background_tasks.start()
 
@@ -318,13 +328,18 @@ async def shutdown_event():
     
     # Disconnect Redis
     await redis_manager.disconnect()
+    
+    # Close pooled provider connections
+    await close_http_client()
 
 
 @app.get("/cache/stats")
 async def get_cache_stats():
     """Get semantic cache statistics"""
     cache = await get_semantic_cache()
-    return cache.get_stats()
+    stats = cache.get_stats()
+    stats["audio"] = get_tts_audio_cache().get_stats()
+    return stats
 
 
 @app.delete("/cache/clear")
@@ -332,6 +347,7 @@ async def clear_cache():
     """Clear the semantic cache"""
     cache = await get_semantic_cache()
     cleared = await cache.clear()
+    get_tts_audio_cache().clear()
     return {"message": f"Cleared {cleared} cache entries"}
 
 
@@ -342,5 +358,6 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,
-        log_level="info"
+        log_level="info",
+        loop="uvloop"
     )
@@ -3,13 +3,13 @@ Audio Quality Metrics Service
 Calculates SNR, RMS, peak levels, and overall audio quality scores
 """
 
+import io
 import numpy as np
 import logging
-import tempfile
-import os
 import shutil
 from typing import Optional, Dict
 from pydub import AudioSegment
+from app.core.executor import run_blocking
 
 logger = logging.getLogger(__name__)
 
@@ -55,15 +55,9 @@ class AudioMetricsService:
         
         # If ffprobe is available, use pydub for accurate conversion
         if _FFPROBE_AVAILABLE:
-            temp_webm = None
             try:
-                # Write WebM to temp file
-                with tempfile.NamedTemporaryFile(suffix='.webm', delete=False) as f:
-                    f.write(webm_data)
-                    temp_webm = f.name
-                
-                # Load with pydub
-                audio = AudioSegment.from_file(temp_webm, format="webm")
+                # Load with pydub straight from memory (ffmpeg reads it from stdin)
+                audio = AudioSegment.from_file(io.BytesIO(webm_data), format="webm")
                 
                 # Convert to mono, correct sample rate, 16-bit
                 audio = audio.set_channels(1)
@@ -80,12 +74,6 @@ class AudioMetricsService:
                 
             except Exception as e:
                 logger.warning(f"pydub conversion failed: {e}, using fallback estimation")
-            finally:
-                if temp_webm and os.path.exists(temp_webm):
-                    try:
-                        os.unlink(temp_webm)
-                    except:
-                        pass
         
         # Fallback: Estimate from raw bytes (works without ffprobe)
         return self._estimate_samples_from_bytes(webm_data)
@@ -137,7 +125,8 @@ class AudioMetricsService:
         """
         if len(samples) == 0:
             return 0.0
-        return float(np.sqrt(np.mean(samples ** 2)))
+        # dot() sums the squares without allocating a squared copy
+        return float(np.sqrt(np.dot(samples, samples) / len(samples)))
     
     def calculate_peak(self, samples: np.ndarray) -> float:
         """
@@ -301,6 +290,45 @@ class AudioMetricsService:
             - quality_score: Overall quality (0-100)
             - quality_label: Human-readable quality label
         """
+        # Convert to numpy
+        samples = self._webm_to_numpy(webm_data)
+        # True when using byte-estimation (RMS unreliable)
+        return self._analyze_samples(samples, is_fallback=not _FFPROBE_AVAILABLE)
+    
+    def analyze_pcm(self, pcm_data: bytes) -> Dict:
+        """
+        Perform complete audio quality analysis on raw PCM.
+        
+        No decode is needed, so this is cheap enough to run on the event loop.
+        
+        Args:
+            pcm_data: Raw PCM audio (16-bit little-endian, mono)
+            
+        Returns:
+            Dictionary with all metrics (see analyze)
+        """
+        return self._analyze_samples(self._pcm_to_float(pcm_data), is_fallback=False)
+    
+    def pcm_rms(self, pcm_data: bytes) -> float:
+        """
+        RMS of raw PCM only, for hot-path checks that don't need full metrics.
+        
+        Args:
+            pcm_data: Raw PCM audio (16-bit little-endian, mono)
+            
+        Returns:
+            RMS value (0.0 to 1.0)
+        """
+        return self.calculate_rms(self._pcm_to_float(pcm_data))
+    
+    @staticmethod
+    def _pcm_to_float(pcm_data: bytes) -> np.ndarray:
+        """View 16-bit PCM as int16 and scale to float32 [-1, 1] in one pass."""
+        samples = np.frombuffer(pcm_data, dtype='<i2', count=len(pcm_data) // 2)
+        return np.multiply(samples, np.float32(1 / 32768.0), dtype=np.float32)
+    
+    def _analyze_samples(self, samples: Optional[np.ndarray], is_fallback: bool) -> Dict:
+        """Compute the metrics dictionary for normalized float32 samples."""
         result = {
             "rms": 0.0,
             "peak": 0.0,
@@ -309,11 +337,9 @@ class AudioMetricsService:
             "quality_score": 0,
             "quality_label": "unknown",
             "duration_ms": 0,
-            "is_fallback": not _FFPROBE_AVAILABLE  # True when using byte-estimation (RMS unreliable)
+            "is_fallback": is_fallback
         }
         
-        # Convert to numpy
-        samples = self._webm_to_numpy(webm_data)
         if samples is None or len(samples) == 0:
             logger.warning("Could not analyze audio - conversion failed")
             return result
@@ -343,10 +369,26 @@ class AudioMetricsService:
         else:
             result["quality_label"] = "poor"
         
-        logger.info(f"📊 Audio metrics: RMS={result['rms']:.3f}, Peak={result['peak']:.3f}, "
-                   f"SNR={result['snr_db']:.1f}dB, Quality={result['quality_score']}/100 ({result['quality_label']})")
+        # Runs for every audio chunk; only format when debugging
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📊 Audio metrics: RMS=%.3f, Peak=%.3f, SNR=%.1fdB, Quality=%d/100 (%s)",
+                         result["rms"], result["peak"], result["snr_db"],
+                         result["quality_score"], result["quality_label"])
         
         return result
+    
+    async def analyze_async(self, webm_data: bytes) -> Dict:
+        """
+        Same as analyze, but runs the decode and metrics on the shared audio
+        thread pool so the event loop isn't blocked.
+        
+        Args:
+            webm_data: WebM audio bytes
+            
+        Returns:
+            Dictionary with all metrics (see analyze)
+        """
+        return await run_blocking(self.analyze, webm_data)
 
 
 def create_audio_metrics_service(sample_rate: int = 16000) -> AudioMetricsService:
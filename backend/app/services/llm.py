@@ -1,9 +1,9 @@
-import httpx
 import logging
 import json
 from typing import List, Dict, AsyncGenerator, Optional, Tuple
 from dataclasses import dataclass
-from app.config import settings
+from app.config import settings, TIMEOUTS
+from app.core.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +28,21 @@ SEARCH_TOOL = {
 }
 
 
+# Words that suggest the answer needs fresh (web search) information
+SEARCH_KEYWORDS = (
+    "latest", "news", "current", "today", "recent", "now",
+    "happening", "update", "2024", "2025", "2026",
+    "what's going on", "weather", "stock", "price",
+    "who won", "score", "event", "announcement"
+)
+
+
+def may_need_search(user_message: str) -> bool:
+    """Fast keyword check for messages whose answer may be time-sensitive."""
+    message_lower = user_message.lower()
+    return any(kw in message_lower for kw in SEARCH_KEYWORDS)
+
+
 @dataclass
 class ToolCall:
     """Represents a function call from the LLM"""
@@ -61,33 +76,34 @@ class GroqLLMService:
                     }
                 ] + messages
             
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                payload = {
-                    "model": self.model,
-                    "messages": messages,
-                    "temperature": 0.7,
-                    "max_tokens": 500
-                }
-                
-                response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=payload
-                )
-                
-                response.raise_for_status()
-                result = response.json()
-                
-                content = result.get("choices", [{}])[0]\
-                    .get("message", {}).get("content", "")
-                
-                return content.strip()
-                
+            client = get_http_client()
+            headers = {
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            }
+            
+            payload = {
+                "model": self.model,
+                "messages": messages,
+                "temperature": 0.7,
+                "max_tokens": 500
+            }
+            
+            response = await client.post(
+                f"{self.base_url}/chat/completions",
+                headers=headers,
+                json=payload,
+                timeout=TIMEOUTS["groq_llm"]
+            )
+            
+            response.raise_for_status()
+            result = response.json()
+            
+            content = result.get("choices", [{}])[0]\
+                .get("message", {}).get("content", "")
+            
+            return content.strip()
+            
         except Exception as e:
             logger.error(f"Groq LLM error: {e}", exc_info=True)
             return ""
@@ -103,15 +119,7 @@ class GroqLLMService:
             return False, None
         
         # Fast keyword check first
-        search_keywords = [
-            "latest", "news", "current", "today", "recent", "now",
-            "happening", "update", "2024", "2025", "2026",
-            "what's going on", "weather", "stock", "price",
-            "who won", "score", "event", "announcement"
-        ]
-        
-        message_lower = user_message.lower()
-        keyword_match = any(kw in message_lower for kw in search_keywords)
+        keyword_match = may_need_search(user_message)
         
         if not keyword_match:
             logger.info("📚 No search keywords - using knowledge")
@@ -119,16 +127,16 @@ class GroqLLMService:
         
         # Use LLM to decide and generate search query
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                messages = [
-                    {
-                        "role": "system",
-                        "content": """You decide if a web search is needed and generate the search query.
+            client = get_http_client()
+            headers = {
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            }
+            
+            messages = [
+                {
+                    "role": "system",
+                    "content": """You decide if a web search is needed and generate the search query.
 
 Respond in this EXACT format:
 SEARCH: YES or NO
@@ -145,48 +153,49 @@ Use NO when:
 - Opinions or creative content
 - Simple math or logic
 - Casual conversation"""
-                    },
-                    {"role": "user", "content": user_message}
-                ]
-                
-                payload = {
-                    "model": self.model,
-                    "messages": messages,
-                    "temperature": 0.1,
-                    "max_tokens": 100
-                }
-                
-                response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=payload
-                )
-                
-                response.raise_for_status()
-                result = response.json()
-                
-                content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-                
-                # Parse response
-                lines = content.strip().split('\n')
-                needs_search = False
-                search_query = user_message
-                
-                for line in lines:
-                    if line.upper().startswith("SEARCH:"):
-                        needs_search = "YES" in line.upper()
-                    elif line.upper().startswith("QUERY:"):
-                        query = line.split(":", 1)[1].strip()
-                        if query:
-                            search_query = query
-                
-                if needs_search:
-                    logger.info(f"🔍 Search needed: '{search_query}'")
-                else:
-                    logger.info("📚 No search needed - using knowledge")
-                
-                return needs_search, search_query if needs_search else None
-                
+                },
+                {"role": "user", "content": user_message}
+            ]
+            
+            payload = {
+                "model": self.model,
+                "messages": messages,
+                "temperature": 0.1,
+                "max_tokens": 100
+            }
+            
+            response = await client.post(
+                f"{self.base_url}/chat/completions",
+                headers=headers,
+                json=payload,
+                timeout=TIMEOUTS["groq_llm"]
+            )
+            
+            response.raise_for_status()
+            result = response.json()
+            
+            content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+            
+            # Parse response
+            lines = content.strip().split('\n')
+            needs_search = False
+            search_query = user_message
+            
+            for line in lines:
+                if line.upper().startswith("SEARCH:"):
+                    needs_search = "YES" in line.upper()
+                elif line.upper().startswith("QUERY:"):
+                    query = line.split(":", 1)[1].strip()
+                    if query:
+                        search_query = query
+            
+            if needs_search:
+                logger.info(f"🔍 Search needed: '{search_query}'")
+            else:
+                logger.info("📚 No search needed - using knowledge")
+            
+            return needs_search, search_query if needs_search else None
+            
         except Exception as e:
             logger.error(f"Search detection error: {e}", exc_info=True)
             # Fallback: use keyword match result
@@ -210,42 +219,43 @@ Use NO when:
                     }
                 ] + messages
             
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                payload = {
-                    "model": self.model,
-                    "messages": messages,
-                    "temperature": 0.7,
-                    "max_tokens": 500,
-                    "stream": True
-                }
+            client = get_http_client()
+            headers = {
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            }
+            
+            payload = {
+                "model": self.model,
+                "messages": messages,
+                "temperature": 0.7,
+                "max_tokens": 500,
+                "stream": True
+            }
+            
+            async with client.stream(
+                "POST",
+                f"{self.base_url}/chat/completions",
+                headers=headers,
+                json=payload,
+                timeout=TIMEOUTS["groq_llm"]
+            ) as response:
+                response.raise_for_status()
                 
-                async with client.stream(
-                    "POST",
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    response.raise_for_status()
-                    
-                    async for line in response.aiter_lines():
-                        if line.startswith("data: "):
-                            data = line[6:]
-                            if data == "[DONE]":
-                                break
+                async for line in response.aiter_lines():
+                    if line.startswith("data: "):
+                        data = line[6:]
+                        if data == "[DONE]":
+                            break
+                        
+                        try:
+                            chunk = json.loads(data)
+                            delta = chunk.get("choices", [{}])[0].get("delta", {})
+                            if "content" in delta:
+                                yield delta["content"]
+                        except:
+                            continue
                             
-                            try:
-                                chunk = json.loads(data)
-                                delta = chunk.get("choices", [{}])[0].get("delta", {})
-                                if "content" in delta:
-                                    yield delta["content"]
-                            except:
-                                continue
-                                
         except Exception as e:
             logger.error(f"Groq streaming error: {e}", exc_info=True)
             yield ""
@@ -282,42 +292,43 @@ When answering:
             else:
                 messages[0]["content"] = system_content
             
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                payload = {
-                    "model": self.model,
-                    "messages": messages,
-                    "temperature": 0.7,
-                    "max_tokens": 500,
-                    "stream": True
-                }
+            client = get_http_client()
+            headers = {
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            }
+            
+            payload = {
+                "model": self.model,
+                "messages": messages,
+                "temperature": 0.7,
+                "max_tokens": 500,
+                "stream": True
+            }
+            
+            async with client.stream(
+                "POST",
+                f"{self.base_url}/chat/completions",
+                headers=headers,
+                json=payload,
+                timeout=TIMEOUTS["groq_llm"]
+            ) as response:
+                response.raise_for_status()
                 
-                async with client.stream(
-                    "POST",
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    response.raise_for_status()
-                    
-                    async for line in response.aiter_lines():
-                        if line.startswith("data: "):
-                            data = line[6:]
-                            if data == "[DONE]":
-                                break
+                async for line in response.aiter_lines():
+                    if line.startswith("data: "):
+                        data = line[6:]
+                        if data == "[DONE]":
+                            break
+                        
+                        try:
+                            chunk = json.loads(data)
+                            delta = chunk.get("choices", [{}])[0].get("delta", {})
+                            if "content" in delta:
+                                yield delta["content"]
+                        except:
+                            continue
                             
-                            try:
-                                chunk = json.loads(data)
-                                delta = chunk.get("choices", [{}])[0].get("delta", {})
-                                if "content" in delta:
-                                    yield delta["content"]
-                            except:
-                                continue
-                                
         except Exception as e:
             logger.error(f"Groq streaming with context error: {e}", exc_info=True)
             yield ""
@@ -1,22 +1,63 @@
-import httpx
+import hashlib
 import logging
-from app.config import settings
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Union, AsyncIterator
+from app.config import settings, TIMEOUTS
+from app.core.retry import retry_async
+from app.core.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
 class DeepgramSTTService:
     """Deepgram Speech-to-Text Service"""
     
+    # Max number of transcripts kept in the in-memory audio cache
+    CACHE_SIZE = 1024
+    
     def __init__(self):
         self.api_key = settings.DEEPGRAM_API_KEY
         self.base_url = "https://api.deepgram.com/v1"
         
-    async def transcribe(self, audio_bytes: bytes) -> str:
+        # LRU cache of {sha256(audio): transcript} for repeated clips
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_stats = {"hits": 0, "misses": 0}
+    
+    def _cache_get(self, key: str) -> Optional[str]:
+        """Look up a cached transcript and mark it as recently used."""
+        transcript = self._cache.get(key)
+        if transcript is None:
+            self._cache_stats["misses"] += 1
+            return None
+        self._cache.move_to_end(key)
+        self._cache_stats["hits"] += 1
+        return transcript
+    
+    def _cache_put(self, key: str, transcript: str):
+        """Store a transcript, evicting the least recently used entry if full."""
+        self._cache[key] = transcript
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get transcript cache hit/miss statistics."""
+        total = self._cache_stats["hits"] + self._cache_stats["misses"]
+        hit_rate = (self._cache_stats["hits"] / total * 100) if total > 0 else 0
+        return {
+            "hits": self._cache_stats["hits"],
+            "misses": self._cache_stats["misses"],
+            "size": len(self._cache),
+            "hit_rate": f"{hit_rate:.1f}%"
+        }
+        
+    async def transcribe(self, audio_source: Union[bytes, AsyncIterator[bytes]]) -> str:
         """
         Transcribe audio to text
         
         Args:
-            audio_bytes: Raw audio data
+            audio_source: Raw audio data, or an async iterator of audio chunks.
+                Iterators are streamed to Deepgram with chunked transfer
+                encoding instead of being buffered in memory first.
             
         Returns:
             Transcribed text
@@ -25,58 +66,101 @@ class DeepgramSTTService:
             logger.warning("Deepgram API key not set, using mock transcription")
             return "This is a mock transcription. Please set DEEPGRAM_API_KEY."
         
+        hasher = None
         try:
-            logger.info(f"Transcribing audio, size: {len(audio_bytes)} bytes")
+            if isinstance(audio_source, (bytes, bytearray)):
+                # Identical audio clips always produce the same transcript
+                cache_key = hashlib.sha256(audio_source).hexdigest()
+                cached = self._cache_get(cache_key)
+                if cached is not None:
+                    logger.info(f"🎯 STT cache HIT ({self._cache_stats['hits']} hits, "
+                                f"{self._cache_stats['misses']} misses)")
+                    return cached
+                content = audio_source
+                header = audio_source[:4]
+                logger.info(f"Transcribing audio, size: {len(audio_source)} bytes")
+            else:
+                # Streamed audio can only be hashed as it goes out; cache afterwards
+                first_chunk = await anext(audio_source, b"")
+                hasher = hashlib.sha256()
+                content = self._hash_stream(first_chunk, audio_source, hasher)
+                header = first_chunk[:4]
+                logger.info("Transcribing streamed audio")
+            
             # Log first few bytes to check format
-            if len(audio_bytes) > 4:
-                header = audio_bytes[:4]
-                logger.info(f"Audio header: {header.hex()}")
+            if len(header) == 4 and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Audio header: %s", header.hex())
+            
+            client = get_http_client()
+            # Auto-detect format based on header
+            content_type = "audio/webm"  # Default
+            if header == b'RIFF':
+                content_type = "audio/wav"
+            elif header == b'\x1a\x45\xdf\xa3':
+                content_type = "audio/webm"
+            
+            logger.debug("Detected content-type: %s", content_type)
+            
+            headers = {
+                "Authorization": f"Token {self.api_key}",
+                "Content-Type": content_type
+            }
             
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                # Auto-detect format based on header
-                content_type = "audio/webm"  # Default
-                if len(audio_bytes) > 4:
-                    if audio_bytes[:4] == b'RIFF':
-                        content_type = "audio/wav"
-                    elif audio_bytes[:4] == b'\x1a\x45\xdf\xa3':
-                        content_type = "audio/webm"
-                
-                logger.info(f"Detected content-type: {content_type}")
-                
-                headers = {
-                    "Authorization": f"Token {self.api_key}",
-                    "Content-Type": content_type
-                }
-                
-                params = {
-                    "model": "nova-2",
-                    "smart_format": "true"
-                }
-                
-                response = await client.post(
+            params = {
+                "model": "nova-2",
+                "smart_format": "true"
+            }
+            
+            # A streamed body can't be replayed, so only bytes get a retry
+            response = await retry_async(
+                lambda: client.post(
                     f"{self.base_url}/listen",
                     headers=headers,
                     params=params,
-                    content=audio_bytes
-                )
-                
-                if response.status_code != 200:
-                    logger.error(f"Deepgram error: {response.status_code} - {response.text}")
-                
-                response.raise_for_status()
-                result = response.json()
-                
-                logger.info(f"Deepgram response: {result}")
-                
-                # Extract transcript
-                transcript = result.get("results", {}).get("channels", [{}])[0]\
-                    .get("alternatives", [{}])[0].get("transcript", "")
-                
-                logger.info(f"Extracted transcript: {transcript}")
-                
-                return transcript.strip()
-                
+                    content=content,
+                    timeout=TIMEOUTS["deepgram_stt"]
+                ),
+                attempts=2 if hasher is None else 1
+            )
+            
+            if response.status_code != 200:
+                logger.error(f"Deepgram error: {response.status_code} - {response.text}")
+            
+            response.raise_for_status()
+            result = response.json()
+            
+            # Full response dicts are large; only format them when debugging
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Deepgram response: %s", result)
+            
+            # Extract transcript
+            transcript = result.get("results", {}).get("channels", [{}])[0]\
+                .get("alternatives", [{}])[0].get("transcript", "")
+            
+            logger.debug("Extracted transcript: %s", transcript)
+            
+            transcript = transcript.strip()
+            if transcript:
+                if hasher is not None:
+                    cache_key = hasher.hexdigest()
+                self._cache_put(cache_key, transcript)
+            return transcript
+            
         except Exception as e:
             logger.error(f"Deepgram STT error: {e}", exc_info=True)
             # Return empty instead of raising to keep session alive
             return ""
+    
+    @staticmethod
+    async def _hash_stream(
+        first_chunk: bytes,
+        chunks: AsyncIterator[bytes],
+        hasher
+    ) -> AsyncIterator[bytes]:
+        """Re-emit a chunk stream (after its peeked first chunk) while hashing it."""
+        if first_chunk:
+            hasher.update(first_chunk)
+            yield first_chunk
+        async for chunk in chunks:
+            hasher.update(chunk)
+            yield chunk
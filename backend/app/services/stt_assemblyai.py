@@ -6,8 +6,11 @@ Provides STT fallback when Deepgram is unavailable.
 import httpx
 import logging
 import asyncio
+import time
 from typing import Optional
-from app.config import settings
+from app.config import settings, TIMEOUTS
+from app.core.retry import retry_async
+from app.core.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +18,11 @@ logger = logging.getLogger(__name__)
 class AssemblyAISTTService:
     """AssemblyAI STT Service - Backup provider for Deepgram"""
     
+    # Transcript polling (seconds): backoff doubles from initial up to max
+    POLL_INITIAL_DELAY = 0.1
+    POLL_MAX_DELAY = 1.0
+    POLL_TIMEOUT = 30.0
+    
     def __init__(self):
         self.api_key = settings.ASSEMBLYAI_API_KEY
         self.base_url = "https://api.assemblyai.com/v2"
@@ -48,64 +56,71 @@ class AssemblyAISTTService:
             "content-type": "application/octet-stream"
         }
         
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            # Step 1: Upload audio
-            upload_response = await client.post(
+        client = get_http_client()
+        # Step 1: Upload audio
+        upload_response = await retry_async(
+            lambda: client.post(
                 f"{self.base_url}/upload",
                 headers=headers,
-                content=audio_data
+                content=audio_data,
+                timeout=TIMEOUTS["assemblyai_upload"]
             )
-            
-            if upload_response.status_code != 200:
-                logger.error(f"AssemblyAI upload failed: {upload_response.status_code}")
-                raise Exception(f"Upload failed: {upload_response.text}")
-            
-            upload_url = upload_response.json()["upload_url"]
-            logger.debug(f"Audio uploaded to AssemblyAI")
-            
-            # Step 2: Create transcription
-            transcript_response = await client.post(
-                f"{self.base_url}/transcript",
-                headers={"authorization": self.api_key, "content-type": "application/json"},
-                json={
-                    "audio_url": upload_url,
-                    "language_code": "en",
-                    "speech_model": "best"  # Use best quality model
-                }
+        )
+        
+        if upload_response.status_code != 200:
+            logger.error(f"AssemblyAI upload failed: {upload_response.status_code}")
+            raise Exception(f"Upload failed: {upload_response.text}")
+        
+        upload_url = upload_response.json()["upload_url"]
+        logger.debug(f"Audio uploaded to AssemblyAI")
+        
+        # Step 2: Create transcription
+        transcript_response = await client.post(
+            f"{self.base_url}/transcript",
+            headers={"authorization": self.api_key, "content-type": "application/json"},
+            json={
+                "audio_url": upload_url,
+                "language_code": "en",
+                "speech_model": "best"  # Use best quality model
+            },
+            timeout=TIMEOUTS["assemblyai_upload"]
+        )
+        
+        if transcript_response.status_code != 200:
+            logger.error(f"AssemblyAI transcript creation failed: {transcript_response.status_code}")
+            raise Exception(f"Transcript creation failed: {transcript_response.text}")
+        
+        transcript_id = transcript_response.json()["id"]
+        logger.debug(f"Transcription job created: {transcript_id}")
+        
+        # Step 3: Poll for result (first poll immediately, then exponential backoff)
+        delay = self.POLL_INITIAL_DELAY
+        deadline = time.monotonic() + self.POLL_TIMEOUT
+        while time.monotonic() < deadline:
+            poll_response = await client.get(
+                f"{self.base_url}/transcript/{transcript_id}",
+                headers={"authorization": self.api_key},
+                timeout=TIMEOUTS["assemblyai_upload"]
             )
             
-            if transcript_response.status_code != 200:
-                logger.error(f"AssemblyAI transcript creation failed: {transcript_response.status_code}")
-                raise Exception(f"Transcript creation failed: {transcript_response.text}")
+            result = poll_response.json()
+            status = result.get("status")
             
-            transcript_id = transcript_response.json()["id"]
-            logger.debug(f"Transcription job created: {transcript_id}")
+            if status == "completed":
+                text = result.get("text", "")
+                logger.info(f"📝 AssemblyAI transcript: {text[:50]}...")
+                return text
             
-            # Step 3: Poll for result
-            max_attempts = 30  # 30 seconds max
-            for attempt in range(max_attempts):
-                poll_response = await client.get(
-                    f"{self.base_url}/transcript/{transcript_id}",
-                    headers={"authorization": self.api_key}
-                )
-                
-                result = poll_response.json()
-                status = result.get("status")
-                
-                if status == "completed":
-                    text = result.get("text", "")
-                    logger.info(f"📝 AssemblyAI transcript: {text[:50]}...")
-                    return text
-                
-                elif status == "error":
-                    error = result.get("error", "Unknown error")
-                    logger.error(f"AssemblyAI transcription error: {error}")
-                    raise Exception(f"Transcription failed: {error}")
-                
-                # Still processing
-                await asyncio.sleep(1)
+            elif status == "error":
+                error = result.get("error", "Unknown error")
+                logger.error(f"AssemblyAI transcription error: {error}")
+                raise Exception(f"Transcription failed: {error}")
             
-            raise TimeoutError("AssemblyAI transcription timed out after 30 seconds")
+            # Still processing
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.POLL_MAX_DELAY)
+        
+        raise TimeoutError(f"AssemblyAI transcription timed out after {self.POLL_TIMEOUT:.0f} seconds")
     
     async def health_check(self) -> bool:
         """Check if AssemblyAI is reachable"""
@@ -4,13 +4,17 @@ Real-time speech-to-text using WebSocket for word-by-word transcription
 """
 import asyncio
 import logging
-import json
+import orjson
 from typing import Optional, Callable, Awaitable
 from app.config import settings
+from app.core.buffer_pool import AudioBufferPool
 import websockets
 
 logger = logging.getLogger(__name__)
 
+# Control message never varies; must go out as a text frame (binary = audio)
+CLOSE_STREAM_MESSAGE = orjson.dumps({"type": "CloseStream"}).decode()
+
 
 class DeepgramStreamingSTT:
     """
@@ -21,6 +25,25 @@ class DeepgramStreamingSTT:
     """
     
     DEEPGRAM_WS_URL = "wss://api.deepgram.com/v1/listen"
+    # Query parameters are identical for every session, so build the URL once
+    DEEPGRAM_WS_URL_FULL = (
+        f"{DEEPGRAM_WS_URL}"
+        "?model=nova-2"
+        "&language=en"
+        "&smart_format=true"
+        "&interim_results=true"      # Enable word-by-word updates
+        "&utterance_end_ms=1000"     # Detect end of utterance after 1s silence
+        "&vad_events=true"           # Get voice activity events
+        "&endpointing=300"           # Faster endpointing (300ms)
+        "&no_delay=true"             # Automatic format detection for WebM/Opus
+    )
+    # Raw PCM has no container header, so Deepgram must be told the format
+    DEEPGRAM_WS_URL_PCM = f"{DEEPGRAM_WS_URL_FULL}&encoding=linear16&channels=1&sample_rate="
+    MAX_BATCH_BYTES = 16000  # Flush a batch early once it reaches this size
+    # Batch scratch buffers, shared by all sessions; room for the chunk that crosses the limit
+    _batch_pool = AudioBufferPool(buffer_size=2 * MAX_BATCH_BYTES)
+    EVENT_QUEUE_SIZE = 256   # Pending callback events before interim transcripts are dropped
+    EVENT_DRAIN_TIMEOUT = 2.0  # Seconds disconnect() waits for queued finals to be delivered
     
     def __init__(
         self,
@@ -44,27 +67,22 @@ class DeepgramStreamingSTT:
         self.on_speech_started = on_speech_started
         self.on_utterance_end = on_utterance_end
         
+        self._url = self.DEEPGRAM_WS_URL_FULL
         self._ws: Optional[websockets.WebSocketClientProtocol] = None
         self._listen_task: Optional[asyncio.Task] = None
+        
+        # Outgoing audio is coalesced into batches to cut per-frame sends
+        self.batch_window = settings.STT_BATCH_MS / 1000
+        self._send_queue: Optional[asyncio.Queue] = None
+        self._sender_task: Optional[asyncio.Task] = None
+        
+        # Callbacks run from a separate task so they never stall frame parsing
+        self._event_queue: Optional[asyncio.Queue] = None
+        self._dispatch_task: Optional[asyncio.Task] = None
         self._connected = False
         self._current_transcript = ""
         self._speech_detected = False
         
-    def _build_ws_url(self) -> str:
-        """Build WebSocket URL with query parameters."""
-        params = [
-            "model=nova-2",
-            "language=en",
-            "smart_format=true",
-            "interim_results=true",      # Enable word-by-word updates
-            "utterance_end_ms=1000",     # Detect end of utterance after 1s silence
-            "vad_events=true",           # Get voice activity events
-            "endpointing=300",           # Faster endpointing (300ms)
-            # Automatic format detection for WebM/Opus
-            "no_delay=true"
-        ]
-        return f"{self.DEEPGRAM_WS_URL}?{'&'.join(params)}"
-    
     async def connect(self) -> bool:
         """Establish WebSocket connection to Deepgram."""
         if not self.api_key:
@@ -72,7 +90,7 @@ class DeepgramStreamingSTT:
             return False
             
         try:
-            url = self._build_ws_url()
+            url = self._url
             headers = {"Authorization": f"Token {self.api_key}"}
             
             self._ws = await websockets.connect(
@@ -80,12 +98,24 @@ class DeepgramStreamingSTT:
                 extra_headers=headers,
                 ping_interval=20,
                 ping_timeout=10,
+                # Compressed audio gains nothing from permessage-deflate
+                compression=None,
+                max_size=1 << 20,
+                read_limit=1 << 16,
+                write_limit=1 << 16,
             )
             self._connected = True
             
             # Start listening for responses
+            # Unbounded: finals and utterance ends must never be dropped
+            self._event_queue = asyncio.Queue()
+            self._dispatch_task = asyncio.create_task(self._dispatch_loop())
             self._listen_task = asyncio.create_task(self._listen_loop())
             
+            # Start batching outgoing audio
+            self._send_queue = asyncio.Queue()
+            self._sender_task = asyncio.create_task(self._sender_loop())
+            
             logger.info("✅ Deepgram streaming STT connected")
             return True
             
@@ -99,9 +129,9 @@ class DeepgramStreamingSTT:
         try:
             async for message in self._ws:
                 try:
-                    data = json.loads(message)
-                    await self._handle_message(data)
-                except json.JSONDecodeError:
+                    data = orjson.loads(message)
+                    self._handle_message(data)
+                except orjson.JSONDecodeError:
                     logger.warning(f"Invalid JSON from Deepgram: {message[:100]}")
                 except Exception as e:
                     logger.error(f"Error handling Deepgram message: {e}")
@@ -113,7 +143,32 @@ class DeepgramStreamingSTT:
         finally:
             self._connected = False
     
-    async def _handle_message(self, data: dict):
+    def _emit(self, callback: Optional[Callable[..., Awaitable[None]]], *args, droppable: bool = False):
+        """
+        Queue a callback invocation for the dispatch task.
+        
+        Args:
+            callback: Coroutine function to invoke
+            droppable: True for events superseded by the next one (interim
+                transcripts); only these are dropped when the queue backs up
+        """
+        if callback is None or self._event_queue is None:
+            return
+        if droppable and self._event_queue.qsize() >= self.EVENT_QUEUE_SIZE:
+            logger.warning("Deepgram event queue backed up - dropping interim transcript")
+            return
+        self._event_queue.put_nowait((callback, args))
+    
+    async def _dispatch_loop(self):
+        """Invoke queued callbacks in order, isolated from the listen loop."""
+        while (event := await self._event_queue.get()) is not None:
+            callback, args = event
+            try:
+                await callback(*args)
+            except Exception as e:
+                logger.error(f"Error in streaming STT callback: {e}")
+    
+    def _handle_message(self, data: dict):
         """Process messages from Deepgram."""
         msg_type = data.get("type", "")
         
@@ -121,26 +176,23 @@ class DeepgramStreamingSTT:
         if msg_type == "SpeechStarted":
             logger.debug("🎤 Speech started")
             self._speech_detected = True
-            if self.on_speech_started:
-                await self.on_speech_started()
+            self._emit(self.on_speech_started)
             return
         
         # Utterance end (silence detected after speech)
         if msg_type == "UtteranceEnd":
             logger.debug("🔇 Utterance ended")
-            if self.on_utterance_end:
-                await self.on_utterance_end()
+            self._emit(self.on_utterance_end)
             return
         
         # Transcription results
         if msg_type == "Results":
-            channel = data.get("channel", {})
-            alternatives = channel.get("alternatives", [])
-            
-            if not alternatives:
+            # Direct indexing: no throwaway {} / [] defaults on every frame
+            try:
+                transcript = data["channel"]["alternatives"][0]["transcript"].strip()
+            except (KeyError, IndexError, TypeError, AttributeError):
                 return
             
-            transcript = alternatives[0].get("transcript", "").strip()
             is_final = data.get("is_final", False)
             speech_final = data.get("speech_final", False)
             
@@ -149,46 +201,119 @@ class DeepgramStreamingSTT:
             
             if is_final:
                 # Final transcript for this segment
-                logger.info(f"📝 Final: '{transcript}'")
+                logger.info("📝 Final: '%s'", transcript)
                 self._current_transcript = transcript
                 
-                if self.on_final_transcript:
-                    await self.on_final_transcript(transcript)
+                self._emit(self.on_final_transcript, transcript)
                     
                 # If speech_final, the complete utterance is done
                 if speech_final:
-                    logger.info(f"✅ Utterance complete: '{transcript}'")
+                    logger.info("✅ Utterance complete: '%s'", transcript)
                     self._speech_detected = False
             else:
                 # Interim (partial) transcript - word-by-word updates
-                logger.debug(f"💬 Interim: '{transcript}'")
+                logger.debug("💬 Interim: '%s'", transcript)
                 self._current_transcript = transcript
                 
-                if self.on_interim_transcript:
-                    await self.on_interim_transcript(transcript)
+                self._emit(self.on_interim_transcript, transcript, droppable=True)
+    
+    def set_pcm_input(self, sample_rate: Optional[int]):
+        """
+        Stream raw 16-bit mono PCM instead of WebM/Opus.
+        
+        Takes effect on the next connect().
+        
+        Args:
+            sample_rate: PCM sample rate in Hz, or None to go back to WebM/Opus
+        """
+        if sample_rate is None:
+            self._url = self.DEEPGRAM_WS_URL_FULL
+        else:
+            self._url = f"{self.DEEPGRAM_WS_URL_PCM}{sample_rate}"
     
     async def send_audio(self, audio_data: bytes):
         """
-        Send audio data to Deepgram for transcription.
+        Queue audio data to be sent to Deepgram for transcription.
+        
+        Audio is coalesced by the sender task into batches of up to
+        STT_BATCH_MS, so callers feeding small frames don't pay for one
+        websocket send per frame.
         
         Args:
-            audio_data: Raw PCM audio (16-bit, 16kHz, mono)
+            audio_data: WebM/Opus chunk, or raw PCM after set_pcm_input()
         """
-        if not self._connected or not self._ws:
+        if not self._connected or not self._ws or not self._send_queue:
             logger.warning("Cannot send audio - not connected")
             return
-            
+        
+        self._send_queue.put_nowait(audio_data)
+    
+    def _drain_send_queue(self, batch: bytearray, size: int) -> int:
+        """
+        Copy queued audio into batch after its first size bytes without
+        waiting, up to MAX_BATCH_BYTES. Returns the new batch size.
+        """
+        while size < self.MAX_BATCH_BYTES:
+            try:
+                chunk = self._send_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            batch[size:size + len(chunk)] = chunk
+            size += len(chunk)
+        return size
+    
+    async def _send_batch(self, batch: bytearray, size: int):
+        """Send the first size bytes of batch, then return it to the pool."""
         try:
-            await self._ws.send(audio_data)
+            if size and self._ws:
+                # websockets copies the payload into the frame, so the
+                # buffer is free to reuse once send() returns
+                with memoryview(batch) as view:
+                    await self._ws.send(view[:size])
         except Exception as e:
             logger.error(f"Error sending audio to Deepgram: {e}")
+        finally:
+            self._batch_pool.release(batch)
+    
+    async def _sender_loop(self):
+        """Coalesce queued audio into batches and send them to Deepgram."""
+        while True:
+            chunk = await self._send_queue.get()
+            batch = self._batch_pool.acquire()
+            batch[:len(chunk)] = chunk
+            size = len(chunk)
+            try:
+                # Give more frames a chance to arrive before sending
+                if size < self.MAX_BATCH_BYTES:
+                    await asyncio.sleep(self.batch_window)
+            finally:
+                # Also runs on cancellation so the batch in hand isn't dropped
+                size = self._drain_send_queue(batch, size)
+                await self._send_batch(batch, size)
+    
+    async def _stop_sender(self):
+        """Stop the sender task and flush any audio still queued."""
+        if self._sender_task:
+            self._sender_task.cancel()
+            try:
+                await self._sender_task
+            except asyncio.CancelledError:
+                pass
+            self._sender_task = None
+        
+        if self._send_queue:
+            while not self._send_queue.empty():
+                batch = self._batch_pool.acquire()
+                size = self._drain_send_queue(batch, 0)
+                await self._send_batch(batch, size)
     
     async def finalize(self):
         """Signal end of audio stream (optional, for clean close)."""
         if self._ws and self._connected:
+            await self._stop_sender()
             try:
                 # Send close stream message
-                await self._ws.send(json.dumps({"type": "CloseStream"}))
+                await self._ws.send(CLOSE_STREAM_MESSAGE)
             except Exception as e:
                 logger.warning(f"Error sending close stream: {e}")
     
@@ -196,6 +321,15 @@ class DeepgramStreamingSTT:
         """Close the WebSocket connection."""
         self._connected = False
         
+        if self._sender_task:
+            self._sender_task.cancel()
+            try:
+                await self._sender_task
+            except asyncio.CancelledError:
+                pass
+            self._sender_task = None
+        self._send_queue = None
+        
         if self._listen_task:
             self._listen_task.cancel()
             try:
@@ -204,6 +338,19 @@ class DeepgramStreamingSTT:
                 pass
             self._listen_task = None
         
+        if self._dispatch_task:
+            # Deliver finals still queued before stopping; no new events can
+            # arrive now that the listen task is gone
+            self._event_queue.put_nowait(None)
+            try:
+                await asyncio.wait_for(self._dispatch_task, timeout=self.EVENT_DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning("Timed out delivering queued Deepgram events")
+            except asyncio.CancelledError:
+                pass
+            self._dispatch_task = None
+        self._event_queue = None
+        
         if self._ws:
             try:
                 await self._ws.close()
@@ -1,10 +1,26 @@
-import httpx
+import base64
+import json
 import logging
 import struct
-from app.config import settings
+import numpy as np
+from typing import AsyncIterator, Tuple
+from app.config import settings, TIMEOUTS
+from app.core.retry import retry_async
+from app.core.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
+# Output format requested from Cartesia (raw PCM, mono, 16-bit)
+SAMPLE_RATE = 24000
+CHANNELS = 1
+SAMPLE_WIDTH = 2
+WAV_HEADER_FORMAT = '<4sI4s4sIHHIIHH4sI'
+WAV_HEADER_SIZE = struct.calcsize(WAV_HEADER_FORMAT)  # 44 bytes
+
+# Minimum PCM per streamed segment (~250ms) so the client isn't flooded with tiny clips
+STREAM_MIN_CHUNK_BYTES = SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH // 4
+
+
 class CartesiaTTSService:
     """Cartesia Text-to-Speech Service"""
     
@@ -12,6 +28,18 @@ class CartesiaTTSService:
         self.api_key = settings.CARTESIA_API_KEY
         self.base_url = "https://api.cartesia.ai"
         
+        # Header for the default output format; only the two size fields vary
+        self._wav_header_template = bytearray(struct.pack(
+            WAV_HEADER_FORMAT,
+            b'RIFF', 0, b'WAVE', b'fmt ', 16, 1,
+            CHANNELS,
+            SAMPLE_RATE,
+            SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH,
+            CHANNELS * SAMPLE_WIDTH,
+            SAMPLE_WIDTH * 8,
+            b'data', 0
+        ))
+        
     async def synthesize(self, text: str) -> bytes:
         """
         Convert text to speech
@@ -21,76 +49,168 @@ class CartesiaTTSService:
             
         Returns:
             Audio data as bytes (WAV format)
+            
+        Raises:
+            ValueError: If the Cartesia API key is not configured
+            httpx.HTTPError: If the request fails
+        """
+        # Failures raise rather than returning placeholder audio, so callers
+        # (provider fallback, the response audio cache) can tell them apart
+        samples, sample_rate = await self.synthesize_pcm(text)
+        
+        # Wrap in WAV only at the egress boundary (byte view, no copy)
+        return self._pcm_to_wav(memoryview(samples).cast('B'), sample_rate=sample_rate, channels=CHANNELS, sample_width=SAMPLE_WIDTH)
+    
+    async def synthesize_pcm(self, text: str) -> Tuple[np.ndarray, int]:
+        """
+        Convert text to speech as raw samples
+        
+        For audio pipelines (VAD, resampling, loudness) that work on samples
+        directly instead of parsing a WAV back apart.
+        
+        Args:
+            text: Text to convert
+            
+        Returns:
+            Tuple of (int16 mono samples, sample rate). The array is a
+            read-only view over the response body.
+            
+        Raises:
+            ValueError: If the Cartesia API key is not configured
+            httpx.HTTPError: If the request fails
         """
         if not self.api_key:
-            logger.warning("Cartesia API key not set, returning empty audio")
-            return self._generate_silence()
+            raise ValueError("Cartesia API key not configured")
         
-        try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                headers = {
-                    "X-API-Key": self.api_key,
-                    "Cartesia-Version": "2024-06-10",
-                    "Content-Type": "application/json"
-                }
-                
-                payload = {
-                    "model_id": "sonic-english",
-                    "transcript": text,
-                    "voice": {
-                        "mode": "id",
-                        "id": "a0e99841-438c-4a64-b679-ae501e7d6091"
-                    },
-                    "output_format": {
-                        "container": "raw",
-                        "encoding": "pcm_s16le",
-                        "sample_rate": 24000
-                    }
-                }
-                
-                response = await client.post(
-                    f"{self.base_url}/tts/bytes",
-                    headers=headers,
-                    json=payload
-                )
+        client = get_http_client()
+        response = await retry_async(
+            lambda: client.post(
+                f"{self.base_url}/tts/bytes",
+                headers=self._build_headers(),
+                json=self._build_payload(text),
+                timeout=TIMEOUTS["cartesia_tts"]
+            )
+        )
+        
+        response.raise_for_status()
+        return np.frombuffer(response.content, dtype='<i2'), SAMPLE_RATE
+    
+    async def synthesize_stream(self, text: str) -> AsyncIterator[bytes]:
+        """
+        Stream speech as it is generated using Cartesia's SSE endpoint.
+        
+        Audio starts arriving while the rest of the utterance is still being
+        rendered server-side. PCM is regrouped into self-contained WAV segments
+        of at least STREAM_MIN_CHUNK_BYTES so the client can decode and queue
+        each one independently.
+        
+        Args:
+            text: Text to convert
+            
+        Yields:
+            Audio segments as bytes (WAV format)
+            
+        Raises:
+            ValueError: If the Cartesia API key is not configured
+        """
+        if not self.api_key:
+            raise ValueError("Cartesia API key not configured")
+        
+        pending = bytearray()
+        client = get_http_client()
+        async with client.stream(
+            "POST",
+            f"{self.base_url}/tts/sse",
+            headers=self._build_headers(),
+            json=self._build_payload(text),
+            timeout=TIMEOUTS["cartesia_tts"]
+        ) as response:
+            response.raise_for_status()
+            
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
                 
-                response.raise_for_status()
-                pcm_data = response.content
+                try:
+                    event = json.loads(line[6:])
+                except json.JSONDecodeError:
+                    continue
                 
-                # Convert PCM to WAV
-                return self._pcm_to_wav(pcm_data, sample_rate=24000, channels=1, sample_width=2)
+                event_type = event.get("type")
+                if event_type == "error":
+                    raise Exception(f"Cartesia stream error: {event.get('error')}")
+                if event_type == "done" or event.get("done"):
+                    break
+                if event_type != "chunk" or not event.get("data"):
+                    continue
                 
-        except Exception as e:
-            logger.error(f"Cartesia TTS error: {e}", exc_info=True)
-            return self._generate_silence()
+                pending += base64.b64decode(event["data"])
+                if len(pending) >= STREAM_MIN_CHUNK_BYTES:
+                    yield self._pcm_to_wav(pending, SAMPLE_RATE, CHANNELS, SAMPLE_WIDTH)
+                    pending = bytearray()
+        
+        if pending:
+            yield self._pcm_to_wav(pending, SAMPLE_RATE, CHANNELS, SAMPLE_WIDTH)
+    
+    def _build_headers(self) -> dict:
+        """Request headers for the Cartesia API"""
+        return {
+            "X-API-Key": self.api_key,
+            "Cartesia-Version": "2024-06-10",
+            "Content-Type": "application/json"
+        }
+    
+    def _build_payload(self, text: str) -> dict:
+        """Synthesis request body (raw 16-bit PCM output)"""
+        return {
+            "model_id": "sonic-english",
+            "transcript": text,
+            "voice": {
+                "mode": "id",
+                "id": "a0e99841-438c-4a64-b679-ae501e7d6091"
+            },
+            "output_format": {
+                "container": "raw",
+                "encoding": "pcm_s16le",
+                "sample_rate": SAMPLE_RATE
+            }
+        }
     
     def _pcm_to_wav(self, pcm_data: bytes, sample_rate: int, channels: int, sample_width: int) -> bytes:
-        """Convert raw PCM data to WAV format"""
-        # WAV header
+        """
+        Convert raw PCM data to WAV format.
+        
+        The header and samples are written into a single preallocated buffer
+        before being frozen into immutable bytes.
+        """
         datasize = len(pcm_data)
-        header = struct.pack(
-            '<4sI4s4sIHHIIHH4sI',
-            b'RIFF',
-            datasize + 36,  # File size - 8
-            b'WAVE',
-            b'fmt ',
-            16,  # fmt chunk size
-            1,   # PCM format
-            channels,
-            sample_rate,
-            sample_rate * channels * sample_width,  # byte rate
-            channels * sample_width,  # block align
-            sample_width * 8,  # bits per sample
-            b'data',
-            datasize
-        )
-        return header + pcm_data
-    
-    def _generate_silence(self, duration_ms: int = 100) -> bytes:
-        """Generate silent audio in WAV format"""
-        sample_rate = 24000
-        channels = 1
-        sample_width = 2
-        num_samples = int(sample_rate * duration_ms / 1000)
-        pcm_data = b'\x00' * (num_samples * channels * sample_width)
-        return self._pcm_to_wav(pcm_data, sample_rate, channels, sample_width)
+        out = bytearray(WAV_HEADER_SIZE + datasize)
+        
+        if (sample_rate, channels, sample_width) == (SAMPLE_RATE, CHANNELS, SAMPLE_WIDTH):
+            # Fast path: copy the precomputed header and patch the size fields
+            out[:WAV_HEADER_SIZE] = self._wav_header_template
+            struct.pack_into('<I', out, 4, datasize + 36)
+            struct.pack_into('<I', out, 40, datasize)
+        else:
+            # WAV header
+            struct.pack_into(
+                WAV_HEADER_FORMAT,
+                out,
+                0,
+                b'RIFF',
+                datasize + 36,  # File size - 8
+                b'WAVE',
+                b'fmt ',
+                16,  # fmt chunk size
+                1,   # PCM format
+                channels,
+                sample_rate,
+                sample_rate * channels * sample_width,  # byte rate
+                channels * sample_width,  # block align
+                sample_width * 8,  # bits per sample
+                b'data',
+                datasize
+            )
+        
+        out[WAV_HEADER_SIZE:] = pcm_data
+        return bytes(out)
@@ -3,16 +3,75 @@ Voice Activity Detection (VAD) Service
 Uses WebRTC VAD for robust speech detection with proper audio conversion
 """
 
+import io
 import webrtcvad
 import logging
-import tempfile
-import os
-import io
-from typing import Optional, Tuple
-from pydub import AudioSegment
+import subprocess
+import numpy as np
+from typing import AsyncIterator, NamedTuple, Optional, Tuple
+from app.core.executor import run_blocking
 
 logger = logging.getLogger(__name__)
 
+# Numba is optional: it compiles the per-frame counter loop to native code
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# PyAV is optional: it decodes in-process via libavcodec, skipping the ffmpeg fork
+try:
+    import av
+    PYAV_AVAILABLE = True
+except ImportError:
+    PYAV_AVAILABLE = False
+
+# Decode any container ffmpeg understands (WebM/Opus from the browser) from
+# stdin to raw 16-bit mono PCM on stdout; the sample rate is appended per detector
+FFMPEG_CMD = [
+    "ffmpeg", "-hide_banner", "-loglevel", "error",
+    "-i", "pipe:0",
+    "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1",
+]
+
+
+# int16 RMS below which a frame is treated as silence without running webrtcvad
+SILENCE_RMS_THRESHOLD = 200
+
+# Per-frame VAD decisions; FRAME_ERROR frames leave the counters untouched
+FRAME_SILENCE = 0
+FRAME_SPEECH = 1
+FRAME_ERROR = 2
+
+
+def _count_vad_frames(decisions, speech_count: int, silence_count: int) -> Tuple[int, int, int]:
+    """
+    Run the consecutive speech/silence counters over a chunk's frame decisions.
+    
+    Args:
+        decisions: Sequence of FRAME_SILENCE / FRAME_SPEECH / FRAME_ERROR values
+        speech_count: Consecutive speech frames carried over from the last chunk
+        silence_count: Consecutive silence frames carried over from the last chunk
+        
+    Returns:
+        Tuple of (speech_frames, speech_count, silence_count)
+    """
+    speech_frames = 0
+    for decision in decisions:
+        if decision == FRAME_SPEECH:
+            speech_frames += 1
+            speech_count += 1
+            silence_count = 0
+        elif decision == FRAME_SILENCE:
+            silence_count += 1
+            speech_count = 0
+    return speech_frames, speech_count, silence_count
+
+
+if NUMBA_AVAILABLE:
+    _count_vad_frames_native = njit(cache=True)(_count_vad_frames)
+
 
 class VoiceActivityDetector:
     """
@@ -69,6 +128,9 @@ class VoiceActivityDetector:
         self.samples_per_frame = int(sample_rate * frame_duration_ms / 1000)
         self.frame_size = self.samples_per_frame * 2  # 2 bytes per sample (16-bit)
         
+        # ffmpeg command for decoding to PCM at this detector's sample rate
+        self._ffmpeg_cmd = FFMPEG_CMD + ["-ar", str(sample_rate), "pipe:1"]
+        
         # Initialize WebRTC VAD
         self.vad = webrtcvad.Vad(aggressiveness)
         
@@ -85,7 +147,8 @@ class VoiceActivityDetector:
     def convert_webm_to_pcm(self, webm_data: bytes) -> Optional[bytes]:
         """
         Convert WebM audio to PCM format suitable for VAD.
-        Uses pydub for reliable conversion.
+        Decodes in-process with PyAV when installed, otherwise pipes the
+        audio through ffmpeg in memory (no temp files).
         
         Args:
             webm_data: WebM audio bytes
@@ -96,39 +159,54 @@ class VoiceActivityDetector:
         if len(webm_data) < 100:
             logger.warning(f"WebM data too short: {len(webm_data)} bytes")
             return None
+        
+        if PYAV_AVAILABLE:
+            pcm_data = self._decode_with_pyav(webm_data)
+            if pcm_data:
+                return pcm_data
             
-        temp_webm = None
         try:
-            # Write WebM to temp file (pydub needs file for WebM)
-            with tempfile.NamedTemporaryFile(suffix='.webm', delete=False) as f:
-                f.write(webm_data)
-                temp_webm = f.name
+            proc = subprocess.Popen(
+                self._ffmpeg_cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL
+            )
+            pcm_data, _ = proc.communicate(webm_data)
             
-            # Load with pydub
-            audio = AudioSegment.from_file(temp_webm, format="webm")
+            if proc.returncode != 0 or not pcm_data:
+                logger.error(f"❌ WebM to PCM conversion failed: ffmpeg exited with {proc.returncode}")
+                return None
             
-            # Convert to mono, correct sample rate, 16-bit
-            audio = audio.set_channels(1)
-            audio = audio.set_frame_rate(self.sample_rate)
-            audio = audio.set_sample_width(2)  # 16-bit = 2 bytes
-            
-            # Get raw PCM data
-            pcm_data = audio.raw_data
-            
-            logger.info(f"✅ Converted WebM ({len(webm_data)} bytes) → PCM ({len(pcm_data)} bytes), "
-                       f"duration: {len(audio)}ms")
+            logger.debug("✅ Converted WebM (%d bytes) → PCM (%d bytes), duration: %dms",
+                         len(webm_data), len(pcm_data), len(pcm_data) * 1000 // (self.sample_rate * 2))
             
             return pcm_data
             
         except Exception as e:
             logger.error(f"❌ WebM to PCM conversion failed: {e}")
             return None
-        finally:
-            if temp_webm and os.path.exists(temp_webm):
-                try:
-                    os.unlink(temp_webm)
-                except:
-                    pass
+    
+    def _decode_with_pyav(self, webm_data: bytes) -> Optional[bytes]:
+        """Decode WebM to PCM in-process with PyAV; None on failure."""
+        try:
+            # Fresh resampler per chunk: each WebM chunk is independent, so no
+            # buffered tail samples may leak from one chunk into the next
+            resampler = av.AudioResampler(format="s16", layout="mono", rate=self.sample_rate)
+            
+            pcm_chunks = []
+            with av.open(io.BytesIO(webm_data)) as container:
+                for frame in container.decode(audio=0):
+                    for resampled in resampler.resample(frame):
+                        pcm_chunks.append(resampled.to_ndarray().tobytes())
+            # Flush the samples still buffered inside the resampler
+            for resampled in resampler.resample(None):
+                pcm_chunks.append(resampled.to_ndarray().tobytes())
+            return b"".join(pcm_chunks)
+            
+        except Exception as e:
+            logger.warning(f"⚠️ PyAV decode failed, falling back to ffmpeg: {e}")
+            return None
     
     def analyze_audio(self, webm_data: bytes) -> dict:
         """
@@ -144,6 +222,25 @@ class VoiceActivityDetector:
             - speech_ended: bool - whether speech just ended (silence detected)
             - duration_ms: int - duration of audio analyzed
         """
+        return self._analyze_pcm(self.convert_webm_to_pcm(webm_data))
+    
+    async def analyze_audio_async(self, webm_data: bytes) -> dict:
+        """
+        Same as analyze_audio, but decodes on the shared audio thread pool so
+        the ffmpeg decode doesn't block the event loop. The frame loop itself
+        stays inline (it takes microseconds).
+        
+        Args:
+            webm_data: WebM audio bytes
+            
+        Returns:
+            Dictionary with analysis results (see analyze_audio)
+        """
+        pcm_data = await run_blocking(self.convert_webm_to_pcm, webm_data)
+        return self._analyze_pcm(pcm_data)
+    
+    def _analyze_pcm(self, pcm_data: Optional[bytes]) -> dict:
+        """Run VAD over decoded PCM and update the speech state."""
         result = {
             "has_speech": False,
             "speech_ratio": 0.0,
@@ -152,36 +249,43 @@ class VoiceActivityDetector:
             "frames_analyzed": 0
         }
         
-        # Convert WebM to PCM
-        pcm_data = self.convert_webm_to_pcm(webm_data)
         if not pcm_data:
             logger.warning("Could not convert audio for VAD analysis")
             return result
         
-        # Process frames
-        total_frames = 0
-        speech_frames = 0
+        # Classify every full frame (including the last one). Frames are
+        # zero-copy slices; is_speech accepts any read-only buffer.
+        frame_size = self.frame_size
+        total_frames = len(pcm_data) // frame_size
+        pcm_view = memoryview(pcm_data).toreadonly()
+        decisions = bytearray(total_frames)  # Defaults to FRAME_SILENCE
         
-        for i in range(0, len(pcm_data) - self.frame_size, self.frame_size):
-            frame = pcm_data[i:i + self.frame_size]
-            
-            if len(frame) != self.frame_size:
-                continue
-                
-            total_frames += 1
+        # Energy pre-filter: obviously quiet frames never reach webrtcvad
+        frames = np.frombuffer(pcm_data, dtype='<i2', count=total_frames * self.samples_per_frame)
+        frames = frames.reshape(total_frames, self.samples_per_frame).astype(np.int32)
+        frame_rms = np.sqrt((frames * frames).mean(axis=1))
+        loud_frames = np.flatnonzero(frame_rms >= SILENCE_RMS_THRESHOLD).tolist()
+        
+        for i in loud_frames:
+            frame = pcm_view[i * frame_size:(i + 1) * frame_size]
             
             try:
-                is_speech = self.vad.is_speech(frame, self.sample_rate)
-                if is_speech:
-                    speech_frames += 1
-                    self.speech_frame_count += 1
-                    self.silence_frame_count = 0
-                else:
-                    self.silence_frame_count += 1
-                    self.speech_frame_count = 0
+                if self.vad.is_speech(frame, self.sample_rate):
+                    decisions[i] = FRAME_SPEECH
             except Exception as e:
                 logger.debug(f"VAD frame error: {e}")
-                continue
+                decisions[i] = FRAME_ERROR
+        
+        # Update the consecutive speech/silence counters in one pass
+        if NUMBA_AVAILABLE:
+            counts = _count_vad_frames_native(
+                np.frombuffer(decisions, dtype=np.uint8),
+                self.speech_frame_count,
+                self.silence_frame_count
+            )
+        else:
+            counts = _count_vad_frames(decisions, self.speech_frame_count, self.silence_frame_count)
+        speech_frames, self.speech_frame_count, self.silence_frame_count = counts
         
         if total_frames > 0:
             result["speech_ratio"] = speech_frames / total_frames
@@ -208,8 +312,9 @@ class VoiceActivityDetector:
             result["speech_ended"] = True
             logger.info(f"🤫 Speech ENDED (total speech frames: {self.total_speech_frames})")
         
-        logger.info(f"📊 VAD: {speech_frames}/{total_frames} frames = {result['speech_ratio']:.1%} speech, "
-                   f"speaking={self.is_speaking}, speech_ended={result['speech_ended']}")
+        logger.debug("📊 VAD: %d/%d frames = %.1f%% speech, speaking=%s, speech_ended=%s",
+                     speech_frames, total_frames, result["speech_ratio"] * 100,
+                     self.is_speaking, result["speech_ended"])
         
         return result
     
@@ -230,9 +335,13 @@ class VoiceActivityDetector:
             logger.warning(f"Frame size mismatch: expected {self.frame_size}, got {len(audio_frame)}")
             return self.is_speaking, False
         
-        # Run VAD on this frame
+        # Run VAD on this frame (skipped when it's obviously silent)
         try:
-            frame_is_speech = self.vad.is_speech(audio_frame, self.sample_rate)
+            samples = np.frombuffer(audio_frame, dtype='<i2').astype(np.int32)
+            if np.sqrt((samples * samples).mean()) < SILENCE_RMS_THRESHOLD:
+                frame_is_speech = False
+            else:
+                frame_is_speech = self.vad.is_speech(audio_frame, self.sample_rate)
         except Exception as e:
             logger.error(f"VAD error: {e}")
             return self.is_speaking, False
@@ -283,7 +392,7 @@ class VoiceActivityDetector:
 def create_vad_service(
     aggressiveness: int = 2,
     sample_rate: int = 16000,
-    silence_frames: int = 15
+    silence_frames: int = 23
 ) -> VoiceActivityDetector:
     """
     Factory function to create a VAD service with sensible defaults.
@@ -305,8 +414,72 @@ def create_vad_service(
     return VoiceActivityDetector(
         sample_rate=sample_rate,
         aggressiveness=aggressiveness,
-        frame_duration_ms=30,  # 30ms frames for smooth detection
-        speech_frames_threshold=3,  # 90ms of speech to start
-        silence_frames_threshold=silence_frames,  # Configurable silence detection
+        frame_duration_ms=20,  # 20ms frames: lowest WebRTC VAD error rate, finer endpointing
+        speech_frames_threshold=5,  # 100ms of speech to start
+        silence_frames_threshold=silence_frames,  # Configurable silence detection (23 = ~460ms)
         silence_timeout_ms=800  # 800ms silence timeout
     )
+
+
+class VADEvent(NamedTuple):
+    """Speech state after one VAD frame."""
+    is_speaking: bool
+    state_changed: bool
+    speech_ended: bool
+
+
+class StreamingVAD:
+    """
+    Incremental VAD over a stream of audio chunks.
+    
+    Raw PCM goes straight through process_frame one frame at a time, with
+    any partial frame carried over to the next chunk, so nothing is decoded
+    or re-analyzed. WebM chunks (standalone recordings from legacy clients)
+    are decoded off the event loop first.
+    """
+    
+    def __init__(self, detector: Optional[VoiceActivityDetector] = None):
+        """
+        Initialize streaming VAD.
+        
+        Args:
+            detector: Detector holding the speech state (one per session)
+        """
+        self.detector = detector or create_vad_service()
+        self._leftover = bytearray()
+    
+    async def feed(self, chunk: bytes, is_pcm: bool = True) -> AsyncIterator[VADEvent]:
+        """
+        Feed an audio chunk and yield one event per complete frame.
+        
+        Args:
+            chunk: Raw PCM (16-bit mono at the detector's rate) or WebM bytes
+            is_pcm: False if chunk is a WebM recording that must be decoded
+            
+        Yields:
+            VADEvent for each frame processed
+        """
+        if not is_pcm:
+            chunk = await run_blocking(self.detector.convert_webm_to_pcm, chunk)
+            if not chunk:
+                return
+            # A WebM chunk is a complete recording; don't splice it onto PCM
+            self._leftover.clear()
+        
+        self._leftover += chunk
+        frame_size = self.detector.frame_size
+        usable = len(self._leftover) - len(self._leftover) % frame_size
+        if usable == 0:
+            return
+        
+        frames = memoryview(bytes(self._leftover[:usable]))
+        del self._leftover[:usable]
+        
+        for offset in range(0, usable, frame_size):
+            is_speaking, state_changed = self.detector.process_frame(frames[offset:offset + frame_size])
+            yield VADEvent(is_speaking, state_changed, state_changed and not is_speaking)
+    
+    def reset(self):
+        """Reset speech state and drop any buffered partial frame."""
+        self.detector.reset()
+        self._leftover.clear()
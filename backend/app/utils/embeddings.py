@@ -1,7 +1,14 @@
 """
 Embeddings utility for semantic search and caching.
-Uses sentence-transformers with a lightweight, fast model.
-Falls back to hash-based matching if sentence-transformers is not available.
+Uses an int8-quantized ONNX export of the model when EMBEDDING_ONNX_DIR is set,
+otherwise sentence-transformers with a lightweight, fast model.
+Falls back to hash-based matching if neither is available.
+
+To build the ONNX model directory:
+    optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 \
+        --task feature-extraction --optimize O3 onnx/
+    then quantize onnx/model.onnx to onnx/model_quantized.onnx with
+    onnxruntime.quantization.quantize_dynamic(..., weight_type=QuantType.QInt8)
 """
 import os
 import hashlib
@@ -12,27 +19,141 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-# Check if sentence-transformers is available
+# Check which embedding backends are available
 EMBEDDINGS_AVAILABLE = False
+ONNX_AVAILABLE = False
+SENTENCE_TRANSFORMERS_AVAILABLE = False
 _model = None
 MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+ONNX_MODEL_DIR = os.getenv("EMBEDDING_ONNX_DIR", "")
+
+# Cap inference threads so an embedding call doesn't oversubscribe the CPU
+# while VAD/STT/TTS work runs in the same process. OMP_NUM_THREADS must be
+# set before torch/onnxruntime are imported.
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "2"))
+os.environ.setdefault("OMP_NUM_THREADS", str(EMBED_THREADS))
+
+if ONNX_MODEL_DIR:
+    try:
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        ONNX_AVAILABLE = True
+    except ImportError:
+        logger.warning("⚠️ EMBEDDING_ONNX_DIR is set but onnxruntime/tokenizers are not installed")
 
 try:
     from sentence_transformers import SentenceTransformer
-    EMBEDDINGS_AVAILABLE = True
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
 except ImportError:
+    pass
+
+EMBEDDINGS_AVAILABLE = ONNX_AVAILABLE or SENTENCE_TRANSFORMERS_AVAILABLE
+if not EMBEDDINGS_AVAILABLE:
     logger.warning("⚠️ sentence-transformers not available, using hash-based matching")
 
 
+class OnnxEmbeddingModel:
+    """
+    Sentence embedding model running on ONNX Runtime.
+    
+    Loads an (int8-quantized) ONNX export of the sentence-transformers model
+    and exposes the same encode() call, so callers don't care which backend
+    is in use. Output is mean-pooled and L2-normalized like all-MiniLM-L6-v2.
+    """
+    
+    MAX_LENGTH = 256  # all-MiniLM-L6-v2 max_seq_length
+    
+    def __init__(self, model_dir: str):
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.MAX_LENGTH)
+        self.tokenizer.enable_padding()
+        
+        model_path = os.path.join(model_dir, "model_quantized.onnx")
+        if not os.path.exists(model_path):
+            model_path = os.path.join(model_dir, "model.onnx")
+        
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = EMBED_THREADS
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+    
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        **kwargs
+    ) -> np.ndarray:
+        """
+        Embed one text or a list of texts.
+        
+        Returns:
+            float32 array of shape (D,) for a single text or (N, D) for a list
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + batch_size])
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feeds = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": attention_mask
+            }
+            if "token_type_ids" in self._input_names:
+                feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+            
+            token_embeddings = self.session.run(None, feeds)[0]
+            
+            # Mean-pool over real tokens, then L2-normalize
+            mask = attention_mask[..., np.newaxis].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            batches.append(pooled.astype(np.float32))
+        
+        if not batches:
+            return np.zeros((0, 0), dtype=np.float32)
+        
+        embeddings = np.vstack(batches)
+        return embeddings[0] if single else embeddings
+
+
+def _set_torch_threads():
+    """Limit torch's intra-op pool to EMBED_THREADS and inter-op to one thread."""
+    import torch
+    torch.set_num_threads(EMBED_THREADS)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set once, before any inter-op work has started
+        pass
+
+
 def get_model():
     """Lazy load the embedding model."""
     global _model
     if not EMBEDDINGS_AVAILABLE:
         return None
     
-    if _model is None:
+    if _model is None and ONNX_AVAILABLE:
+        try:
+            logger.info(f"🔄 Loading ONNX embedding model from {ONNX_MODEL_DIR}")
+            _model = OnnxEmbeddingModel(ONNX_MODEL_DIR)
+            logger.info(f"✅ ONNX embedding model loaded")
+        except Exception as e:
+            logger.error(f"❌ Failed to load ONNX embedding model: {e}")
+    
+    if _model is None and SENTENCE_TRANSFORMERS_AVAILABLE:
         try:
             logger.info(f"🔄 Loading embedding model: {MODEL_NAME}")
+            _set_torch_threads()
             _model = SentenceTransformer(MODEL_NAME)
             logger.info(f"✅ Embedding model loaded: {MODEL_NAME}")
         except Exception as e:
@@ -41,34 +162,66 @@ def get_model():
     return _model
 
 
-def get_embedding(text: str) -> List[float]:
+def _hash_embedding(text: str) -> List[float]:
     """
-    Get embedding vector for a single text.
-    Falls back to hash-based pseudo-embedding if model not available.
+    Create a simple hash-based pseudo-embedding.
+    This won't give semantic similarity, but allows the system to work.
     """
+    digest = np.frombuffer(hashlib.sha256(text.lower().strip().encode()).digest(), dtype=np.uint8)
+    # Scale digest bytes to floats (fake embedding); _to_digest reverses this
+    return (digest / 255.0).tolist()
+
+
+def _to_digest(vectors) -> np.ndarray:
+    """Recover the uint8 digest bytes from hash pseudo-embedding(s)."""
+    return np.rint(np.asarray(vectors, dtype=np.float32) * 255.0).astype(np.uint8)
+
+
+@lru_cache(maxsize=4096)
+def _embed_cached(text: str) -> tuple:
+    """Embed already-normalized text; cached since short utterances repeat a lot."""
     model = get_model()
     if model is None:
-        # Fallback: create a simple hash-based pseudo-embedding
-        # This won't give semantic similarity, but allows the system to work
-        hash_val = hashlib.sha256(text.lower().strip().encode()).hexdigest()
-        # Convert hash to a list of floats (fake embedding)
-        return [float(int(hash_val[i:i+2], 16)) / 255.0 for i in range(0, 64, 2)]
+        return tuple(_hash_embedding(text))
     
     embedding = model.encode(text, convert_to_numpy=True)
-    return embedding.tolist()
+    return tuple(embedding.tolist())
+
+
+def get_embedding(text: str) -> List[float]:
+    """
+    Get embedding vector for a single text.
+    Falls back to hash-based pseudo-embedding if model not available.
+    
+    Text is stripped and lowercased before lookup (the MiniLM tokenizer is
+    uncased anyway), so repeats like "Yes" / "yes " share one cache entry.
+    """
+    return list(_embed_cached(text.strip().lower()))
 
 
 def get_embeddings(texts: List[str]) -> List[List[float]]:
-    """Get embedding vectors for multiple texts."""
-    return [get_embedding(text) for text in texts]
+    """
+    Get embedding vectors for multiple texts.
+    Encodes all texts in batched forward passes rather than one call per text.
+    """
+    if not texts:
+        return []
+    
+    model = get_model()
+    if model is None:
+        return [_hash_embedding(text) for text in texts]
+    
+    embeddings = model.encode(texts, batch_size=min(64, len(texts)), convert_to_numpy=True)
+    return embeddings.tolist()
 
 
 def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     """
     Calculate cosine similarity between two vectors.
+    Computed in float32 (model precision) rather than numpy's float64 default.
     """
-    a = np.array(vec1)
-    b = np.array(vec2)
+    a = np.asarray(vec1, dtype=np.float32)
+    b = np.asarray(vec2, dtype=np.float32)
     
     dot_product = np.dot(a, b)
     norm_a = np.linalg.norm(a)
@@ -80,22 +233,96 @@ def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     return float(dot_product / (norm_a * norm_b))
 
 
+class EmbeddingIndex:
+    """
+    Reusable similarity index over a set of embeddings.
+    
+    Rows are L2-normalized once when added and kept as a single float32
+    (N, D) matrix, so each query is one matrix-vector product instead of
+    re-converting and re-normalizing every candidate per call.
+    
+    Without an embedding model the index holds hash pseudo-embeddings as
+    uint8 digests and scores them with Hamming similarity instead.
+    """
+    
+    def __init__(self):
+        self._matrix: Optional[np.ndarray] = None
+        self._use_hamming = not EMBEDDINGS_AVAILABLE
+    
+    def __len__(self) -> int:
+        return 0 if self._matrix is None else self._matrix.shape[0]
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalize along the last axis; zero-length vectors stay zero."""
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+    
+    def add(self, embeddings: Union[List[float], List[List[float]], np.ndarray]):
+        """Append one embedding or a batch of embeddings to the index."""
+        rows = np.asarray(embeddings, dtype=np.float32)
+        if rows.ndim == 1:
+            rows = rows[np.newaxis, :]
+        if rows.size == 0:
+            return
+        
+        rows = _to_digest(rows) if self._use_hamming else self._normalize(rows)
+        self._matrix = rows if self._matrix is None else np.vstack((self._matrix, rows))
+    
+    def clear(self):
+        """Remove all embeddings from the index."""
+        self._matrix = None
+    
+    def query(
+        self,
+        query_embedding: Union[List[float], np.ndarray],
+        top_k: int = 5,
+        threshold: float = 0.0
+    ) -> List[tuple]:
+        """
+        Find the indexed embeddings most similar to a query.
+        
+        Only the top_k candidates above threshold are sorted.
+        
+        Returns:
+            List of (row_index, similarity) tuples, best match first
+        """
+        if self._matrix is None or top_k <= 0:
+            return []
+        
+        if self._use_hamming:
+            differing = np.bitwise_count(self._matrix ^ _to_digest(query_embedding)).sum(axis=1)
+            sims = 1.0 - differing / (8 * self._matrix.shape[1])
+        else:
+            query = self._normalize(np.asarray(query_embedding, dtype=np.float32))
+            sims = self._matrix @ query
+        
+        idx = np.flatnonzero(sims >= threshold)
+        if len(idx) > top_k:
+            idx = idx[np.argpartition(-sims[idx], top_k - 1)[:top_k]]
+        idx = idx[np.argsort(-sims[idx], kind="stable")]
+        
+        return [(int(i), float(sims[i])) for i in idx]
+
+
 def find_most_similar(
     query_embedding: List[float],
     candidate_embeddings: List[List[float]],
     top_k: int = 5,
     threshold: float = 0.0
 ) -> List[tuple]:
-    """Find the most similar embeddings to a query."""
-    similarities = []
+    """
+    Find the most similar embeddings to a query.
     
-    for i, candidate in enumerate(candidate_embeddings):
-        sim = cosine_similarity(query_embedding, candidate)
-        if sim >= threshold:
-            similarities.append((i, sim))
+    For candidates that are queried repeatedly, keep an EmbeddingIndex
+    instead so they are only converted and normalized once.
     
-    similarities.sort(key=lambda x: x[1], reverse=True)
-    return similarities[:top_k]
+    Returns:
+        List of (candidate_index, similarity) tuples, best match first
+    """
+    index = EmbeddingIndex()
+    index.add(candidate_embeddings)
+    return index.query(query_embedding, top_k, threshold)
 
 
 def preload_model():
@@ -105,6 +332,8 @@ def preload_model():
         return
     try:
         get_model()
+        # Drop any embeddings computed before the model was available
+        _embed_cached.cache_clear()
         logger.info("✅ Embedding model preloaded")
     except Exception as e:
         logger.warning(f"⚠️ Could not preload embedding model: {e}")
@@ -2,15 +2,17 @@
 WebSocket Handler for Voice Sessions
 """
 from fastapi import WebSocket
+import asyncio
+import functools
 import logging
-import json
+import orjson
+from typing import Optional
 from app.core.session_streaming import VoiceSessionStreaming
 from app.core.session_manager import session_manager
 from app.services.stt import DeepgramSTTService
 from app.services.llm import GroqLLMService
 from app.services.tts import CartesiaTTSService
-from app.services.audio_metrics import create_audio_metrics_service
-from app.services.vad import create_vad_service
+from app.services.audio_metrics import AudioMetricsService, create_audio_metrics_service
 
 # Provider fallback imports
 from app.services.stt_assemblyai import AssemblyAISTTService
@@ -24,45 +26,151 @@ from app.core.provider_manager import (
 
 logger = logging.getLogger(__name__)
 
-# Initialize primary services
-stt_service = DeepgramSTTService()
-llm_service = GroqLLMService()
-tts_service = CartesiaTTSService()
+# Binary frames this small carry no usable audio (PCM chunks are 8000 bytes,
+# WebM chunks vary in size, so the guard can't be dropped entirely)
+MIN_AUDIO_BYTES = 100
 
-# Initialize backup services
-assemblyai_stt = AssemblyAISTTService()
-openai_llm = OpenAILLMService()
-openai_tts = OpenAITTSService()
 
-# Register providers with managers
-# STT Providers (Deepgram primary, AssemblyAI backup)
-stt_manager = get_stt_manager()
-stt_manager.register(DeepgramSTTProvider(stt_service))
-if assemblyai_stt.api_key:
-    stt_manager.register(AssemblyAISTTProvider(assemblyai_stt))
+# Services are built on first use (once per worker) rather than at import
+@functools.cache
+def get_stt_service() -> DeepgramSTTService:
+    """Primary STT service."""
+    return DeepgramSTTService()
 
-# LLM Providers (Groq primary, OpenAI backup)
-llm_manager = get_llm_manager()
-llm_manager.register(GroqLLMProvider(llm_service))
-if openai_llm.api_key:
-    llm_manager.register(OpenAILLMProvider(openai_llm))
 
-# TTS Providers (Cartesia primary, OpenAI backup)
-tts_manager = get_tts_manager()
-tts_manager.register(CartesiaTTSProvider(tts_service))
-if openai_tts.api_key:
-    tts_manager.register(OpenAITTSProvider(openai_tts))
+@functools.cache
+def get_llm_service() -> GroqLLMService:
+    """Primary LLM service."""
+    return GroqLLMService()
 
-# Audio Quality Metrics
-audio_metrics_service = create_audio_metrics_service(sample_rate=16000)
 
-# Voice Activity Detection
-vad_service = create_vad_service(aggressiveness=2)
+@functools.cache
+def get_tts_service() -> CartesiaTTSService:
+    """Primary TTS service."""
+    return CartesiaTTSService()
 
-logger.info("✅ Voice services initialized with provider fallback")
 
+@functools.cache
+def get_audio_metrics_service() -> AudioMetricsService:
+    """Audio quality metrics (stateless, shared by all sessions)."""
+    return create_audio_metrics_service(sample_rate=16000)
 
-async def handle_voice_session(websocket: WebSocket, session_id: str, user_id: str = None):
+
+@functools.cache
+def register_voice_providers():
+    """Register primary and backup providers with the managers (runs once)."""
+    # Initialize backup services
+    assemblyai_stt = AssemblyAISTTService()
+    openai_llm = OpenAILLMService()
+    openai_tts = OpenAITTSService()
+    
+    # STT Providers (Deepgram primary, AssemblyAI backup)
+    stt_manager = get_stt_manager()
+    stt_manager.register(DeepgramSTTProvider(get_stt_service()))
+    if assemblyai_stt.api_key:
+        stt_manager.register(AssemblyAISTTProvider(assemblyai_stt))
+    
+    # LLM Providers (Groq primary, OpenAI backup)
+    llm_manager = get_llm_manager()
+    llm_manager.register(GroqLLMProvider(get_llm_service()))
+    if openai_llm.api_key:
+        llm_manager.register(OpenAILLMProvider(openai_llm))
+    
+    # TTS Providers (Cartesia primary, OpenAI backup)
+    tts_manager = get_tts_manager()
+    tts_manager.register(CartesiaTTSProvider(get_tts_service()))
+    if openai_tts.api_key:
+        tts_manager.register(OpenAITTSProvider(openai_tts))
+    
+    logger.info("✅ Voice services initialized with provider fallback")
+
+
+# Speech boundaries from the client VAD frame the audio stream, so they are
+# handled on the audio queue, in order with the PCM chunks around them
+STREAM_ORDERED_MESSAGES = frozenset({"speech_start", "speech_end"})
+
+
+def _parse_control(text: str) -> Optional[dict]:
+    """Parse a JSON control message, or return None for anything else."""
+    # Control messages are always JSON objects; reject noise up front
+    # instead of paying for a JSONDecodeError on every bad frame
+    if not text.startswith("{"):
+        logger.warning("Non-JSON control message received")
+        return None
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        logger.warning("Invalid JSON message received")
+        return None
+
+
+async def _dispatch_control(session: VoiceSessionStreaming, data: dict):
+    """Hand a parsed control message to the session."""
+    try:
+        if not await session.handle_control_message(data):
+            logger.debug(f"Unknown message type: {data.get('type')}")
+    except Exception as e:
+        logger.error(f"Control message error: {e}")
+
+
+async def _receive_loop(websocket: WebSocket, audio_queue: asyncio.Queue, control_queue: asyncio.Queue):
+    """
+    Route incoming frames to the audio or control queue.
+    
+    ASGI allows only one pending receive() per connection, so this is the
+    single reader; a None sentinel on both queues marks the disconnect.
+    """
+    try:
+        while True:
+            message = await websocket.receive()
+            
+            if message["type"] == "websocket.disconnect":
+                break
+            
+            if message.get("bytes") is not None:
+                audio_queue.put_nowait(message["bytes"])
+            elif message.get("text") is not None:
+                data = _parse_control(message["text"])
+                if data is None:
+                    continue
+                if data.get("type") in STREAM_ORDERED_MESSAGES:
+                    audio_queue.put_nowait(data)
+                else:
+                    control_queue.put_nowait(data)
+    finally:
+        audio_queue.put_nowait(None)
+        control_queue.put_nowait(None)
+
+
+async def _audio_reader(audio_queue: asyncio.Queue, session: VoiceSessionStreaming):
+    """Feed binary audio frames (and speech boundaries) to the session in arrival order."""
+    while (audio_data := await audio_queue.get()) is not None:
+        if isinstance(audio_data, dict):
+            await _dispatch_control(session, audio_data)
+            continue
+        if len(audio_data) <= MIN_AUDIO_BYTES:
+            continue
+        try:
+            await session.process_audio_chunk(audio_data)
+        except Exception as e:
+            # One bad chunk must not end the session; turn failures already
+            # reach the client as error messages
+            logger.error(f"Audio chunk error: {e}")
+
+
+async def _control_reader(control_queue: asyncio.Queue, session: VoiceSessionStreaming):
+    """Dispatch control commands (interrupts etc.), independently of audio processing."""
+    while (data := await control_queue.get()) is not None:
+        await _dispatch_control(session, data)
+
+
+async def handle_voice_session(
+    websocket: WebSocket,
+    session_id: str,
+    user_id: str = None,
+    *,
+    enable_fallback: bool = True
+):
     """
     Handle voice session with streaming responses.
     
@@ -77,21 +185,25 @@ async def handle_voice_session(websocket: WebSocket, session_id: str, user_id: s
         websocket: WebSocket connection
         session_id: Unique session identifier
         user_id: User identifier for session ownership
+        enable_fallback: Route through the provider managers (with backup
+            providers); False talks to the primary services directly
     """
     # Load conversation history from session if available
     stored_session = await session_manager.get_session(session_id)
     previous_history = stored_session.conversation_history if stored_session else []
     
+    if enable_fallback:
+        register_voice_providers()
     session = VoiceSessionStreaming(
         session_id=session_id,
         websocket=websocket,
-        stt_service=stt_service,
-        llm_service=llm_service,
-        tts_service=tts_service,
-        audio_metrics_service=audio_metrics_service,
-        vad_service=vad_service,
+        stt_service=get_stt_service(),
+        llm_service=get_llm_service(),
+        tts_service=get_tts_service(),
+        audio_metrics_service=get_audio_metrics_service(),
         user_id=user_id,
-        initial_history=previous_history
+        initial_history=previous_history,
+        use_provider_managers=enable_fallback
     )
     
     logger.info(f"🎙️ Session started: {session_id} (user: {user_id})")
@@ -102,47 +214,14 @@ async def handle_voice_session(websocket: WebSocket, session_id: str, user_id: s
         # Update session state to listening
         await session_manager.update_session(session_id, state="listening")
         
-        # Handle both binary (audio) and text (JSON control) messages
-        while True:
-            try:
-                message = await websocket.receive()
-                
-                if message["type"] == "websocket.disconnect":
-                    break
-                
-                # Handle text messages (JSON control commands)
-                if "text" in message:
-                    try:
-                        data = json.loads(message["text"])
-                        msg_type = data.get("type")
-                        
-                        if msg_type == "interrupt":
-                            logger.info("🛑 Interrupt command received")
-                            await session.handle_interrupt()
-                            continue
-                        
-                        if msg_type == "cancel_audio":
-                            logger.info("🔇 Cancel audio command received")
-                            await session.handle_interrupt()
-                            continue
-                        
-                        logger.debug(f"Unknown message type: {msg_type}")
-                        
-                    except json.JSONDecodeError:
-                        logger.warning("Invalid JSON message received")
-                    continue
-                
-                # Handle binary messages (audio data)
-                if "bytes" in message:
-                    audio_data = message["bytes"]
-                    if len(audio_data) > 100:
-                        # Reset interrupt flag when new audio comes in
-                        session.reset_interrupt()
-                        await session.process_audio_chunk(audio_data)
-                
-            except Exception as e:
-                logger.error(f"Message error: {e}")
-                await session.send_state_update("listening")
+        # One reader feeds audio and control queues; each is handled by its
+        # own task so an interrupt never waits behind an in-flight turn
+        audio_queue: asyncio.Queue = asyncio.Queue()
+        control_queue: asyncio.Queue = asyncio.Queue()
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(_receive_loop(websocket, audio_queue, control_queue))
+            tg.create_task(_audio_reader(audio_queue, session))
+            tg.create_task(_control_reader(control_queue, session))
             
     except Exception as e:
         logger.error(f"Session error: {e}", exc_info=True)
@@ -155,14 +234,14 @@ async def handle_voice_session(websocket: WebSocket, session_id: str, user_id: s
         
         # Save conversation history to Redis before cleanup
         if session.conversation_history:
+            # Diff against the keys snapshotted at load time; no second read
+            new_messages = session.new_messages() if stored_session else []
+            # One read/write for the state, metadata and all new messages
             await session_manager.update_session(
                 session_id, 
                 state="idle",
-                metadata={"last_history_count": len(session.conversation_history)}
+                metadata={"last_history_count": len(session.conversation_history)},
+                add_messages=new_messages
             )
-            # Update with each message
-            for msg in session.conversation_history:
-                if stored_session and msg not in stored_session.conversation_history:
-                    await session_manager.update_session(session_id, add_message=msg)
         
         await session.cleanup()
@@ -65,18 +65,7 @@ export default function VoiceInterface() {
   }, [cleanup])
 
   useEffect(() => {
-    setAudioCallback((audioDataBase64: string) => {
-      try {
-        const binaryString = atob(audioDataBase64)
-        const bytes = new Uint8Array(binaryString.length)
-        for (let i = 0; i < binaryString.length; i++) {
-          bytes[i] = binaryString.charCodeAt(i)
-        }
-        queueAudio(bytes.buffer)
-      } catch (error) {
-        console.error('Error decoding audio:', error)
-      }
-    })
+    setAudioCallback((audioData: ArrayBuffer) => queueAudio(audioData))
   }, [queueAudio, setAudioCallback])
 
   const handleToggleConnection = async () => {
@@ -0,0 +1,155 @@
+// Raw PCM capture via AudioWorklet: the server gets 16-bit mono PCM directly
+// and skips the WebM/Opus decode on every chunk.
+
+export const PCM_SAMPLE_RATE = 16000
+export const PCM_CHUNK_SAMPLES = 4000 // 250ms per websocket message
+
+const PCM_PROCESSOR_NAME = 'pcm-capture'
+
+// Runs on the audio rendering thread; kept as a string so no extra bundler
+// config is needed to ship the worklet file.
+const PCM_PROCESSOR_SOURCE = `
+class PcmCaptureProcessor extends AudioWorkletProcessor {
+  constructor(options) {
+    super()
+    const { targetSampleRate, chunkSamples } = options.processorOptions
+    this.ratio = sampleRate / targetSampleRate
+    this.chunk = new Int16Array(chunkSamples)
+    this.offset = 0
+    this.position = 0
+  }
+
+  process(inputs) {
+    const channel = inputs[0] && inputs[0][0]
+    if (!channel) return true
+
+    // Decimate to the target rate (a no-op step when the context already runs at it)
+    for (; this.position < channel.length; this.position += this.ratio) {
+      const s = Math.max(-1, Math.min(1, channel[Math.floor(this.position)]))
+      this.chunk[this.offset++] = s < 0 ? s * 0x8000 : s * 0x7fff
+      if (this.offset === this.chunk.length) {
+        this.port.postMessage(this.chunk.buffer, [this.chunk.buffer])
+        this.chunk = new Int16Array(this.chunk.length)
+        this.offset = 0
+      }
+    }
+    this.position -= channel.length
+    return true
+  }
+}
+
+registerProcessor('${PCM_PROCESSOR_NAME}', PcmCaptureProcessor)
+`
+
+// A processor name can only be registered once per context
+const loadedContexts = new WeakSet<BaseAudioContext>()
+
+async function loadPcmProcessor(ctx: BaseAudioContext) {
+  if (loadedContexts.has(ctx)) return
+
+  const url = URL.createObjectURL(new Blob([PCM_PROCESSOR_SOURCE], { type: 'application/javascript' }))
+  try {
+    await ctx.audioWorklet.addModule(url)
+    loadedContexts.add(ctx)
+  } finally {
+    URL.revokeObjectURL(url)
+  }
+}
+
+export function isPcmCaptureSupported(ctx: BaseAudioContext): boolean {
+  return typeof AudioWorkletNode !== 'undefined' && !!ctx.audioWorklet
+}
+
+// Creates a worklet node that posts ArrayBuffers of little-endian int16 PCM
+// (PCM_CHUNK_SAMPLES each) to onChunk. The caller connects a source to it.
+export async function createPcmCaptureNode(
+  ctx: AudioContext,
+  onChunk: (pcm: ArrayBuffer) => void
+): Promise<AudioWorkletNode> {
+  await loadPcmProcessor(ctx)
+
+  const node = new AudioWorkletNode(ctx, PCM_PROCESSOR_NAME, {
+    numberOfInputs: 1,
+    numberOfOutputs: 1,
+    channelCount: 1,
+    processorOptions: {
+      targetSampleRate: PCM_SAMPLE_RATE,
+      chunkSamples: PCM_CHUNK_SAMPLES,
+    },
+  })
+  node.port.onmessage = (event: MessageEvent<ArrayBuffer>) => onChunk(event.data)
+
+  // Keep the node in a rendered graph without playing the mic back
+  const sink = ctx.createGain()
+  sink.gain.value = 0
+  node.connect(sink).connect(ctx.destination)
+
+  return node
+}
+
+// Client-side speech gate: silence never leaves the browser. Quieter than the
+// server's 0.03 RMS silence threshold so the server still gets the final say.
+const SPEECH_RMS_THRESHOLD = 0.015
+const SPEECH_HANGOVER_CHUNKS = 3 // 750ms of silence ends the utterance
+
+export function pcmRms(pcm: ArrayBuffer): number {
+  const samples = new Int16Array(pcm)
+  if (samples.length === 0) return 0
+
+  let sum = 0
+  for (let i = 0; i < samples.length; i++) {
+    const s = samples[i] / 32768
+    sum += s * s
+  }
+  return Math.sqrt(sum / samples.length)
+}
+
+interface SpeechGateCallbacks {
+  onSpeechStart: () => void
+  onAudio: (pcm: ArrayBuffer) => void
+  onSpeechEnd: () => void
+}
+
+// Forwards PCM only between speech start and end. One chunk of pre-roll is
+// kept so the first syllable isn't clipped.
+export function createSpeechGate({ onSpeechStart, onAudio, onSpeechEnd }: SpeechGateCallbacks) {
+  let speaking = false
+  let silentChunks = 0
+  let preRoll: ArrayBuffer | null = null
+
+  const push = (pcm: ArrayBuffer) => {
+    const loud = pcmRms(pcm) > SPEECH_RMS_THRESHOLD
+
+    if (!speaking) {
+      if (!loud) {
+        preRoll = pcm
+        return
+      }
+      speaking = true
+      silentChunks = 0
+      onSpeechStart()
+      if (preRoll) onAudio(preRoll)
+      preRoll = null
+    }
+
+    onAudio(pcm)
+
+    if (loud) {
+      silentChunks = 0
+    } else if (++silentChunks >= SPEECH_HANGOVER_CHUNKS) {
+      speaking = false
+      silentChunks = 0
+      onSpeechEnd()
+    }
+  }
+
+  // End any utterance in progress (e.g. when recording stops)
+  const reset = () => {
+    if (speaking) onSpeechEnd()
+    speaking = false
+    silentChunks = 0
+    preRoll = null
+  }
+
+  return { push, reset }
+}
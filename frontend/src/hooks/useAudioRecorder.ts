@@ -1,5 +1,6 @@
 import { useEffect, useRef, useState, useCallback } from 'react'
 import { useVoiceStore } from '@/store/voiceStore'
+import { PCM_SAMPLE_RATE, createPcmCaptureNode, createSpeechGate, isPcmCaptureSupported } from './pcmCapture'
 
 export function useAudioRecorder() {
   const [isRecording, setIsRecording] = useState(false)
@@ -11,9 +12,11 @@ export function useAudioRecorder() {
   const audioContextRef = useRef<AudioContext | null>(null)
   const analyserRef = useRef<AnalyserNode | null>(null)
   const sourceNodeRef = useRef<MediaStreamAudioSourceNode | null>(null)
+  const pcmNodeRef = useRef<AudioWorkletNode | null>(null)
+  const speechGateRef = useRef<ReturnType<typeof createSpeechGate> | null>(null)
   const animationFrameRef = useRef<number | null>(null)
   const isRecordingRef = useRef(false)
-  const { sendAudio } = useVoiceStore()
+  const { sendAudio, sendAudioFormat, sendSpeechEvent } = useVoiceStore()
 
   // Audio level monitoring
   useEffect(() => {
@@ -60,6 +63,15 @@ export function useAudioRecorder() {
       sourceNodeRef.current.disconnect()
       sourceNodeRef.current = null
     }
+    if (speechGateRef.current) {
+      speechGateRef.current.reset()
+      speechGateRef.current = null
+    }
+    if (pcmNodeRef.current) {
+      pcmNodeRef.current.port.onmessage = null
+      pcmNodeRef.current.disconnect()
+      pcmNodeRef.current = null
+    }
     if (mediaStreamRef.current) {
       mediaStreamRef.current.getTracks().forEach(track => track.stop())
       mediaStreamRef.current = null
@@ -113,6 +125,38 @@ export function useAudioRecorder() {
     })
   }, [sendAudio])
 
+  // Stream raw PCM from an AudioWorklet; resolves false if unsupported
+  const startPcmStream = useCallback(async (ctx: AudioContext, source: MediaStreamAudioSourceNode): Promise<boolean> => {
+    if (!isPcmCaptureSupported(ctx)) {
+      return false
+    }
+
+    try {
+      // Only speech is streamed; the server processes the turn on speech_end
+      const gate = createSpeechGate({
+        onSpeechStart: () => sendSpeechEvent('speech_start'),
+        onAudio: sendAudio,
+        onSpeechEnd: () => sendSpeechEvent('speech_end'),
+      })
+      speechGateRef.current = gate
+
+      const node = await createPcmCaptureNode(ctx, (pcm) => {
+        if (isRecordingRef.current) {
+          gate.push(pcm)
+        }
+      })
+      pcmNodeRef.current = node
+
+      // Announce the format (gated by our speech gate) before the first PCM frame goes out
+      sendAudioFormat('pcm16', PCM_SAMPLE_RATE, true)
+      source.connect(node)
+      return true
+    } catch (error) {
+      console.warn('PCM capture unavailable, falling back to WebM:', error)
+      return false
+    }
+  }, [sendAudio, sendAudioFormat, sendSpeechEvent])
+
   const startRecording = useCallback(async () => {
     try {
       const stream = await navigator.mediaDevices.getUserMedia({
@@ -150,8 +194,13 @@ export function useAudioRecorder() {
       setIsRecording(true)
 
       if (vadMode) {
-        // VAD MODE: Send chunks continuously (1.5s each)
+        // VAD MODE: Stream raw PCM when the browser supports AudioWorklet
+        if (await startPcmStream(audioContextRef.current, source)) {
+          return
+        }
 
+        // Legacy fallback: send WebM chunks continuously (1.5s each)
+        sendAudioFormat('webm')
 
         const recordLoop = async () => {
           while (isRecordingRef.current && mediaStreamRef.current) {
@@ -164,6 +213,7 @@ export function useAudioRecorder() {
 
       } else {
         // PUSH-TO-TALK MODE: Single continuous recording
+        sendAudioFormat('webm')
         const chunks: Blob[] = []
 
         const mediaRecorder = new MediaRecorder(stream, {
@@ -203,7 +253,7 @@ export function useAudioRecorder() {
       setIsRecording(false)
       isRecordingRef.current = false
     }
-  }, [vadMode, recordAndSendChunk, sendAudio, cleanup])
+  }, [vadMode, recordAndSendChunk, startPcmStream, sendAudio, sendAudioFormat, cleanup])
 
   const stopRecording = useCallback(() => {
     isRecordingRef.current = false
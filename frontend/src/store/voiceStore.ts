@@ -3,6 +3,9 @@ import { toast } from './toastStore'
 
 export type VoiceState = 'idle' | 'listening' | 'thinking' | 'speaking' | 'error' | 'reconnecting'
 
+// Type byte at the start of binary server frames (see AUDIO_FRAME_PREFIX on the backend)
+const AUDIO_FRAME_TYPE = 0x01
+
 interface Caption {
   id: string
   speaker: 'user' | 'assistant'
@@ -58,7 +61,7 @@ interface VoiceStore {
   vadStatus: VadStatus
 
   // Audio callback
-  onAudioReceived: ((audioData: string) => void) | null
+  onAudioReceived: ((audioData: ArrayBuffer) => void) | null
 
   // Real-time interim transcript (word-by-word)
   interimText: string
@@ -81,9 +84,11 @@ interface VoiceStore {
   setState: (state: VoiceState) => void
   addCaption: (caption: Caption) => void
   updateLastCaption: (text: string, isFinal?: boolean) => void
-  sendAudio: (audioData: Blob) => void
+  sendAudio: (audioData: Blob | ArrayBuffer) => void
+  sendAudioFormat: (format: 'pcm16' | 'webm', sampleRate?: number, clientVad?: boolean) => void
+  sendSpeechEvent: (event: 'speech_start' | 'speech_end') => void  // Client VAD gate
   sendInterrupt: () => void  // Barge-in interrupt
-  setAudioCallback: (callback: (audioData: string) => void) => void
+  setAudioCallback: (callback: (audioData: ArrayBuffer) => void) => void
   setAudioMetrics: (metrics: AudioMetrics) => void
   setVadStatus: (status: VadStatus) => void
   resetConnection: () => void
@@ -150,6 +155,7 @@ export const useVoiceStore = create<VoiceStore>((set, get) => ({
 
     try {
       const ws = new WebSocket(`${wsUrl}/voice/${sessionId}`)
+      ws.binaryType = 'arraybuffer'
 
       // Connection timeout
       const connectionTimeout = setTimeout(() => {
@@ -175,78 +181,82 @@ export const useVoiceStore = create<VoiceStore>((set, get) => ({
       }
 
       ws.onmessage = (event) => {
-        try {
-          const data = JSON.parse(event.data)
-
-
-          switch (data.type) {
-            case 'state_change':
-              set({ state: data.state })
-              break
+        // Binary frames: one type byte, then the payload (TTS audio)
+        if (event.data instanceof ArrayBuffer) {
+          const frameType = new Uint8Array(event.data, 0, 1)[0]
+          const { onAudioReceived } = get()
+          if (frameType === AUDIO_FRAME_TYPE && onAudioReceived && event.data.byteLength > 1) {
+            onAudioReceived(event.data.slice(1))
+          }
+          return
+        }
 
-            case 'transcript_update': {
-              const caption: Caption = {
-                id: data.data.id,
-                speaker: data.data.speaker,
-                text: data.data.text,
-                timestamp: data.data.timestamp * 1000,
-                isFinal: data.data.is_final
+        try {
+          const payload = JSON.parse(event.data)
+          // Control messages may arrive coalesced into one JSON array
+          const messages = Array.isArray(payload) ? payload : [payload]
+
+          for (const data of messages) {
+            switch (data.type) {
+              case 'state_change':
+                set({ state: data.state })
+                break
+
+              case 'transcript_update': {
+                const caption: Caption = {
+                  id: data.data.id,
+                  speaker: data.data.speaker,
+                  text: data.data.text,
+                  timestamp: data.data.timestamp * 1000,
+                  isFinal: data.data.is_final
+                }
+
+                const { captions, addCaption, updateLastCaption } = get()
+                const lastCaption = captions[captions.length - 1]
+                const clearInterim = data.data.is_final && data.data.speaker === 'user'
+
+                if (lastCaption && lastCaption.speaker === caption.speaker && !lastCaption.isFinal) {
+                  updateLastCaption(caption.text, caption.isFinal)
+                } else {
+                  addCaption(caption)
+                }
+
+                if (clearInterim) {
+                  set({ interimText: '', interimMessageId: null })
+                }
+                break
               }
 
-              const { captions, addCaption, updateLastCaption } = get()
-              const lastCaption = captions[captions.length - 1]
-              const clearInterim = data.data.is_final && data.data.speaker === 'user'
-
-              if (lastCaption && lastCaption.speaker === caption.speaker && !lastCaption.isFinal) {
-                updateLastCaption(caption.text, caption.isFinal)
-              } else {
-                addCaption(caption)
+              case 'audio_metrics': {
+                set({ audioMetrics: data.data })
+                break
               }
 
-              if (clearInterim) {
-                set({ interimText: '', interimMessageId: null })
+              case 'vad_status': {
+                set({ vadStatus: data.data })
+                break
               }
-              break
-            }
 
-            case 'audio': {
+              case 'interrupt_ack': {
 
-              const { onAudioReceived } = get()
-              if (onAudioReceived && data.data) {
-                onAudioReceived(data.data)
+                set({ state: 'listening' })
+                break
               }
-              break
-            }
 
-            case 'audio_metrics': {
-              set({ audioMetrics: data.data })
-              break
-            }
+              case 'error':
 
-            case 'vad_status': {
-              set({ vadStatus: data.data })
-              break
-            }
-
-            case 'interrupt_ack': {
+                toast.error('Server Error', data.message || 'An unexpected error occurred')
+                set({ state: 'listening' })
+                break
 
-              set({ state: 'listening' })
-              break
-            }
+              case 'interim_transcript': {
+                // Real-time word-by-word transcript display
+                const interimText = data.data.text || ''
+                const interimId = data.data.id
+                set({ interimText, interimMessageId: interimId })
 
-            case 'error':
-
-              toast.error('Server Error', data.message || 'An unexpected error occurred')
-              set({ state: 'listening' })
-              break
-
-            case 'interim_transcript': {
-              // Real-time word-by-word transcript display
-              const interimText = data.data.text || ''
-              const interimId = data.data.id
-              set({ interimText, interimMessageId: interimId })
-
-              break
+                break
+              }
             }
           }
         } catch (_error) {
@@ -403,7 +413,7 @@ export const useVoiceStore = create<VoiceStore>((set, get) => ({
     })
   },
 
-  sendAudio: (audioData: Blob) => {
+  sendAudio: (audioData: Blob | ArrayBuffer) => {
     const { ws, isConnected } = get()
     if (ws && isConnected) {
 
@@ -413,6 +423,23 @@ export const useVoiceStore = create<VoiceStore>((set, get) => ({
     }
   },
 
+  // Tell the server what the following binary frames contain
+  // clientVad: the client gates PCM itself (speech_start/speech_end);
+  // otherwise the server runs its own VAD over the stream
+  sendAudioFormat: (format: 'pcm16' | 'webm', sampleRate = 16000, clientVad = false) => {
+    const { ws, isConnected } = get()
+    if (ws && isConnected) {
+      ws.send(JSON.stringify({ type: 'audio_format', format, sample_rate: sampleRate, client_vad: clientVad }))
+    }
+  },
+
+  sendSpeechEvent: (event: 'speech_start' | 'speech_end') => {
+    const { ws, isConnected } = get()
+    if (ws && isConnected) {
+      ws.send(JSON.stringify({ type: event }))
+    }
+  },
+
   sendInterrupt: () => {
     const { ws, isConnected, state } = get()
     if (ws && isConnected && state === 'speaking') {
@@ -422,7 +449,7 @@ export const useVoiceStore = create<VoiceStore>((set, get) => ({
     }
   },
 
-  setAudioCallback: (callback: (audioData: string) => void) => {
+  setAudioCallback: (callback: (audioData: ArrayBuffer) => void) => {
     set({ onAudioReceived: callback })
   },
 